@@ -1,64 +1,25 @@
 
 import os
+import sys
 import csv
 import re
 
-def get_file_path(repo_root, class_name):
-    parts = class_name.split('.')
-    # Handle inner classes
-    if '$' in parts[-1]:
-        parts[-1] = parts[-1].split('$')[0]
-    
-    # wikidev-filters structure: src/ca/...
-    rel_path = os.path.join('src', *parts) + '.java'
-    return os.path.join(repo_root, rel_path)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts"))
+from java_lexer import BlockTree
+from source_index import SourceIndex
 
-def find_signature_for_slice(content, start_offset, end_offset):
+def find_signature_for_slice(content, start_offset, end_offset, blocks=None):
     # We want to find the method definition that encloses [start_offset, end_offset]
     # Strategy:
-    # 1. Find all opening braces '{' before start_offset.
-    # 2. For each brace, check if it closes after end_offset.
-    # 3. The one that is "closest" to start_offset (largest index) and satisfies 2 is the innermost container.
-    # 4. Check if that container is a method.
-    
-    # Find all { and } positions
-    # This is a simple parser, might be fooled by comments/strings, but usually sufficient for this task.
-    
-    # Better: remove comments and strings for parsing structure? 
-    # No, we need exact offsets.
-    # Let's assume code is well-formatted and comments don't contain unbalanced braces often.
-    
-    open_braces = [m.start() for m in re.finditer(r'\{', content)]
-    close_braces = [m.start() for m in re.finditer(r'\}', content)]
-    
-    # Map open brace to close brace
-    # Stack based approach
-    brace_map = {}
-    stack = []
-    
-    # Merge and sort events
-    events = [(pos, '{') for pos in open_braces] + [(pos, '}') for pos in close_braces]
-    events.sort()
-    
-    for pos, type in events:
-        if type == '{':
-            stack.append(pos)
-        elif type == '}':
-            if stack:
-                open_pos = stack.pop()
-                brace_map[open_pos] = pos
-    
-    # Find enclosing blocks
-    candidates = []
-    for open_pos, close_pos in brace_map.items():
-        if open_pos < start_offset and close_pos > end_offset:
-            candidates.append(open_pos)
+    # 1. Find the blocks that open before start_offset and close after end_offset,
+    #    innermost first (braces in comments and literals are ignored by the lexer).
+    # 2. Check if that container is a method.
+    # blocks is the BlockTree of content; pass it in to lex a file only once.
+    blocks = blocks or BlockTree(content)
+    candidates = [block.open for block in blocks.enclosing(start_offset, end_offset)]
             
     if not candidates:
         return None
-        
-    # Sort by start position descending (innermost first)
-    candidates.sort(reverse=True)
     
     for block_start in candidates:
         # Check if this block looks like a method
@@ -124,8 +85,10 @@ def generate_oracle(repo_root):
         return
 
     new_lines = []
+    # Each source file is read and lexed once, however many slices it holds
+    sources = {}
     
-    with open(refined_path, 'r') as f:
+    with SourceIndex(repo_root, "wikidev-filters") as source_index, open(refined_path, 'r') as f:
         reader = csv.DictReader(f)
         for row in reader:
             class_name = row['class_name']
@@ -135,15 +98,18 @@ def generate_oracle(repo_root):
             except:
                 continue
                 
-            file_path = get_file_path(repo_root, class_name)
-            if not os.path.exists(file_path):
-                print(f"File not found: {file_path}")
+            source_file = source_index.get(class_name)
+            if source_file is None:
+                print(f"File not found: {source_index.file_path(class_name)}")
                 continue
                 
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as src:
-                content = src.read()
+            file_path = source_file.path
+            if file_path not in sources:
+                content = source_file.text('ignore')
+                sources[file_path] = (content, BlockTree(content))
+            content, blocks = sources[file_path]
                 
-            signature = find_signature_for_slice(content, start, end)
+            signature = find_signature_for_slice(content, start, end, blocks)
             
             if signature:
                 # Format: Class \t Signature \t eStart:Length;
@@ -151,7 +117,8 @@ def generate_oracle(repo_root):
                 line = f"{class_name}\t{signature}\te{start}:{length};"
                 new_lines.append(line)
             else:
-                print(f"Could not find signature for {class_name} around {start}-{end}")
+                print(f"Could not find signature for {class_name} around {start}-{end} "
+                      f"(lines {source_file.line_number(start)}-{source_file.line_number(end)})")
                 # Fallback: use function name from refined + ()
                 func_name = row['function_name']
                 line = f"{class_name}\tpublic void {func_name}()\te{start}:{end-start};"
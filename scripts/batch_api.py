@@ -0,0 +1,291 @@
+# Two-phase batch mode for batch_slice_methods.py.
+#
+#   render: write every method's chat request into repositories/<project>/batch_requests.jsonl
+#           (OpenAI Batch API input format, one line per method with a stable custom_id),
+#           and the render settings, cache keys and prompt degradations into batch_manifest.json
+#   ingest: read a Batch API results file back into LLM_slices.json, parsed like slice_method_async,
+#           using the cache keys and degradations recorded at render time
+#   local:  stand-in for the Batch API that turns batch_requests.jsonl into batch_results.jsonl
+#           offline, with responses synthesized from oracle_methods.json
+#
+# Usage:
+#   python batch_api.py render [projects...]
+#   python batch_api.py local <project>
+#   python batch_api.py ingest <project> [--results results.jsonl]
+import os
+import sys
+import re
+import json
+import hashlib
+import argparse
+
+import batch_slice_methods as bsm
+from response_cache import ResponseCache, make_cache_key
+from mock_responses import synthesize_completion
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Recovers the custom_id of a result line that is not valid JSON
+CUSTOM_ID_RE = re.compile(r'"custom_id"\s*:\s*"([^"]+)"')
+
+
+def get_batch_paths(project_name):
+    project_dir = os.path.join(bsm.REPOS_DIR, project_name)
+    return (os.path.join(project_dir, "batch_requests.jsonl"),
+            os.path.join(project_dir, "batch_results.jsonl"))
+
+
+def get_manifest_path(project_name):
+    return os.path.join(bsm.REPOS_DIR, project_name, "batch_manifest.json")
+
+
+def load_batch_manifest(project_name):
+    path = get_manifest_path(project_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_custom_id(project_name, class_name, function_name):
+    """
+    Stable id derived from the method identity, so results can be matched back
+    to oracle methods regardless of line order in the results file.
+    """
+    digest = hashlib.sha256(f"{project_name}::{class_name}::{function_name}".encode('utf-8')).hexdigest()
+    return f"slice-{digest[:24]}"
+
+
+def render_job(job, prompt_template, prompt_format):
+    """
+    Returns (messages, degradation) for one job, exactly as the online path renders it.
+    """
+    prompt, degradation = bsm.build_job_prompt(job, prompt_template, prompt_format)
+    return bsm.build_messages(prompt), degradation
+
+
+def render_batch(project_name, prompt_format=bsm.PROMPT_FORMAT):
+    print(f"Rendering batch requests for {project_name}...")
+    jobs = bsm.load_project_jobs(project_name)
+    if jobs is None:
+        return None
+    prompt_template = bsm.load_prompt_template()
+    requests_path, _ = get_batch_paths(project_name)
+    # Ingest reuses these instead of rendering the prompts again with its own settings
+    manifest = {
+        "prompt_format": prompt_format,
+        "model": bsm.MODEL,
+        "temperature": bsm.TEMPERATURE,
+        "max_completion_tokens": bsm.MAX_COMPLETION_TOKENS,
+        "context_window": bsm.CONTEXT_WINDOW,
+        "dd_max_hops": bsm.DD_MAX_HOPS,
+        "requests": {}
+    }
+
+    with open(requests_path, 'w', encoding='utf-8') as f:
+        for job in jobs:
+            method = job["method"]
+            messages, degradation = render_job(job, prompt_template, prompt_format)
+            custom_id = make_custom_id(project_name, method['class_name'], method['function_name'])
+            manifest["requests"][custom_id] = {
+                "cache_key": make_cache_key(messages, bsm.MODEL, bsm.TEMPERATURE, bsm.MAX_COMPLETION_TOKENS),
+                "prompt_degradation": degradation
+            }
+            request = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": bsm.MODEL,
+                    "messages": messages,
+                    "temperature": bsm.TEMPERATURE,
+                    "max_completion_tokens": bsm.MAX_COMPLETION_TOKENS
+                }
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+    with open(get_manifest_path(project_name), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    print(f"  Wrote {len(jobs)} requests to {requests_path}")
+    return requests_path
+
+
+def extract_content(result_line):
+    """
+    Returns the completion text of one Batch API result line, or None on error.
+    """
+    if result_line.get("error"):
+        return None
+    response = result_line.get("response") or {}
+    if response.get("status_code") != 200:
+        return None
+    choices = (response.get("body") or {}).get("choices") or []
+    if not choices:
+        return None
+    return choices[0].get("message", {}).get("content")
+
+
+def read_results(results_path):
+    """
+    Returns ({custom_id: completion text or None}, {custom_id: error message}).
+    A malformed line fails the method whose custom_id it still shows, if any.
+    """
+    contents = {}
+    errors = {}
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                custom_id = entry["custom_id"]
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                match = CUSTOM_ID_RE.search(line)
+                print(f"  Warning: Malformed result on line {number} of {results_path}: {e}")
+                if match:
+                    contents[match.group(1)] = None
+                    errors[match.group(1)] = f"Error: malformed batch result ({e})"
+                continue
+            contents[custom_id] = extract_content(entry)
+    return contents, errors
+
+
+def ingest_batch(project_name, results_path=None, prompt_format=None, use_cache=bsm.CACHE_ENABLED):
+    """
+    Cache keys and prompt degradations come from the batch manifest written by render.
+    Without one (batches rendered before the manifest existed) the prompts are
+    rendered again with prompt_format.
+    """
+    print(f"Ingesting batch results for {project_name}...")
+    jobs = bsm.load_project_jobs(project_name)
+    if jobs is None:
+        return None
+    manifest = load_batch_manifest(project_name)
+    if manifest is None:
+        prompt_format = prompt_format or bsm.PROMPT_FORMAT
+        print(f"  Warning: No {get_manifest_path(project_name)}; rendering the prompts again "
+              f"(prompt format {prompt_format}) for the cache keys")
+        prompt_template = bsm.load_prompt_template()
+    elif prompt_format and prompt_format != manifest["prompt_format"]:
+        print(f"  Note: Using the prompt format the batch was rendered with ({manifest['prompt_format']})")
+    _, default_results_path = get_batch_paths(project_name)
+    results_path = results_path or default_results_path
+    output_path = os.path.join(bsm.REPOS_DIR, project_name, "LLM_slices.json")
+
+    contents, errors = read_results(results_path)
+
+    cache = ResponseCache(bsm.CACHE_DIR, bsm.CACHE_MAX_MB * 1024 * 1024) if use_cache else None
+
+    all_results = []
+    missing = 0
+    for job in jobs:
+        method = job["method"]
+        custom_id = make_custom_id(project_name, method['class_name'], method['function_name'])
+        content = contents.get(custom_id)
+        result = None
+        if content is not None:
+            result = bsm.parse_response(content, method['function_name'])
+            if manifest is not None:
+                rendered = manifest["requests"].get(custom_id)
+                cache_key = rendered["cache_key"] if rendered else None
+                degradation = rendered["prompt_degradation"] if rendered else None
+            else:
+                messages, degradation = render_job(job, prompt_template, prompt_format)
+                cache_key = make_cache_key(messages, bsm.MODEL, bsm.TEMPERATURE, bsm.MAX_COMPLETION_TOKENS)
+            # Seed the response cache so later online or replay-only runs reuse the batch output;
+            # an unparsable answer is not cached, so those runs slice the method again
+            if cache is not None and cache_key is not None and result["slices"]:
+                cache.put(cache_key, result)
+            result["prompt_degradation"] = degradation
+        else:
+            missing += 1
+        if result is not None and not result["slices"]:
+            # Recorded like an online answer without slices: a failure that keeps the response
+            all_results.append(bsm.build_method_result(method, None, "Error: no slices in batch result",
+                                                       "parse", result))
+            continue
+        all_results.append(bsm.build_method_result(
+            method, result, errors.get(custom_id, "Error: missing or failed batch result")))
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(all_results, f, indent=2, ensure_ascii=False)
+    print(f"  Saved {len(all_results)} results ({missing} missing) to {output_path}")
+    return output_path
+
+
+def run_local_batch(project_name, requests_path=None, results_path=None):
+    """
+    Local stand-in for the Batch API: answers every request in the batch file with a
+    response synthesized from oracle_methods.json, in the Batch API output format.
+    """
+    default_requests_path, default_results_path = get_batch_paths(project_name)
+    requests_path = requests_path or default_requests_path
+    results_path = results_path or default_results_path
+
+    oracle_methods_path = os.path.join(bsm.REPOS_DIR, project_name, "oracle_methods.json")
+    with open(oracle_methods_path, 'r', encoding='utf-8') as f:
+        methods = json.load(f)
+    by_custom_id = {make_custom_id(project_name, m['class_name'], m['function_name']): m for m in methods}
+
+    count = 0
+    with open(requests_path, 'r', encoding='utf-8') as src, open(results_path, 'w', encoding='utf-8') as dst:
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            custom_id = request["custom_id"]
+            method = by_custom_id.get(custom_id)
+            if method is None:
+                result = {"id": f"batch_req_{count}", "custom_id": custom_id, "response": None,
+                          "error": {"code": "unknown_custom_id", "message": "No oracle method for this id"}}
+            else:
+                result = {
+                    "id": f"batch_req_{count}",
+                    "custom_id": custom_id,
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "object": "chat.completion",
+                            "model": request["body"]["model"],
+                            "choices": [{
+                                "index": 0,
+                                "message": {"role": "assistant", "content": synthesize_completion(method)},
+                                "finish_reason": "stop"
+                            }]
+                        }
+                    },
+                    "error": None
+                }
+            dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += 1
+
+    print(f"  Local batch answered {count} requests -> {results_path}")
+    return results_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch API mode for LLM slicing.")
+    parser.add_argument("command", choices=["render", "ingest", "local"])
+    parser.add_argument("projects", nargs="*", help="Projects (default: all under repositories/)")
+    parser.add_argument("--results", help="Results JSONL to ingest (default: <project>/batch_results.jsonl)")
+    parser.add_argument("--prompt-format", choices=["json", "compact"], default=None,
+                        help=f"Prompt format to render (default: {bsm.PROMPT_FORMAT}); ingest uses the rendered one")
+    parser.add_argument("--no-cache", action="store_true", help="Do not seed the response cache on ingest")
+    args = parser.parse_args()
+
+    projects = args.projects or [d for d in os.listdir(bsm.REPOS_DIR) if os.path.isdir(os.path.join(bsm.REPOS_DIR, d))]
+    if args.results and len(projects) != 1:
+        sys.exit("--results requires exactly one project")
+
+    for project in projects:
+        if args.command == "render":
+            render_batch(project, args.prompt_format or bsm.PROMPT_FORMAT)
+        elif args.command == "local":
+            run_local_batch(project)
+        else:
+            ingest_batch(project, args.results, args.prompt_format, bsm.CACHE_ENABLED and not args.no_cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,290 +1,695 @@
 import os
 import json
 import time
-from openai import OpenAI
-import re
+import hashlib
+import asyncio
+from openai import AsyncOpenAI
+import argparse
+import functools
+
+from slice_engine import RateLimiter, run_ordered
+from response_cache import ResponseCache, make_cache_key
+from ccg_index import CCGIndex
+from ccg_store import open_ccg_store
+from prompt_format import compact_focal_method, compact_dependencies, compact_ccg, compact_template
+from prompt_budget import CONTEXT_WINDOW, DD_MAX_HOPS, build_budgeted_prompt, count_tokens
+from stream_parser import StreamingSliceParser
+from retry_scheduler import RetryScheduler, SliceError
+from method_dedup import fan_out, group_duplicates
+from usage_tracker import UsageTracker, get_telemetry_path
+from slice_validator import (build_repair_prompt, merge_repair, parse_repair_response, problem_count,
+                             validate_slices)
+from checkpoint import (CheckpointWriter, compact_checkpoint, get_checkpoint_path,
+                        load_checkpoint, method_key)
+from project_executor import add_executor_arguments, resolve_workers, run_projects
+from chatunitest_context import get_context_dir
+from context_store import open_context_store
  
-# Retry settings for transient API failures
+# Retry settings for transient API failures (delays are jittered, see retry_scheduler.py)
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 1  # seconds
 BACKOFF_FACTOR = 2
+MAX_RETRY_DELAY = 60  # seconds
+# Circuit breaker: stop sending after this many consecutive provider failures, for BREAKER_COOLDOWN seconds
+BREAKER_THRESHOLD = int(os.getenv("SLICE_BREAKER_THRESHOLD", "10"))
+BREAKER_COOLDOWN = int(os.getenv("SLICE_BREAKER_COOLDOWN", "60"))
+
+# Model settings
+MODEL = "gpt-4o"
+TEMPERATURE = 0.3
+MAX_COMPLETION_TOKENS = 4096
+SYSTEM_PROMPT = "You are an expert in software engineering and code refactoring, specialized in analyzing and decomposing complex methods."
+
+# Async engine settings: number of requests in flight and provider limits
+MAX_CONCURRENCY = int(os.getenv("SLICE_MAX_CONCURRENCY", "8"))
+REQUESTS_PER_MINUTE = int(os.getenv("SLICE_REQUESTS_PER_MINUTE", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("SLICE_TOKENS_PER_MINUTE", "150000"))
+
+# Response cache settings. In replay-only mode, cache misses are never sent to the API.
+CACHE_ENABLED = os.getenv("SLICE_CACHE", "1") != "0"
+CACHE_MAX_MB = int(os.getenv("SLICE_CACHE_MAX_MB", "512"))
+REPLAY_ONLY = os.getenv("SLICE_REPLAY_ONLY", "0") == "1"
+
+# Streaming: parse slices as they arrive and abort responses that go off the rails
+STREAMING = os.getenv("SLICE_STREAM", "1") != "0"
+MAX_ANALYSIS_CHARS = int(os.getenv("SLICE_MAX_ANALYSIS_CHARS", "12000"))
 
+# Check slices locally (coverage, overlap, brace balance) and send a small repair request on failure
+REPAIR_ENABLED = os.getenv("SLICE_REPAIR", "1") != "0"
+REPAIR_MAX_COMPLETION_TOKENS = 1024
 
-# Initialize OpenAI client
-# Using the key provided in the example attachment
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) 
+# Send one request per unique method body (+ CCG shape) and copy the slices to duplicates
+DEDUP = os.getenv("SLICE_DEDUP", "1") != "0"
+
+# Prompt serialization: "json" (indented JSON blobs) or "compact" (numbered lines + CCG adjacency lists)
+PROMPT_FORMAT = os.getenv("SLICE_PROMPT_FORMAT", "json")
 
 BASE_DIR = r"d:\tools\Code slice matching"
 REPOS_DIR = os.path.join(BASE_DIR, "repositories")
 CCGS_DIR = os.path.join(BASE_DIR, "ccgs")
 PROMPT_FILE = os.path.join(BASE_DIR, "prompt.txt")
+CACHE_DIR = os.getenv("SLICE_CACHE_DIR", os.path.join(BASE_DIR, ".llm_cache"))
 
+# OpenAI-compatible endpoint; point at mock_llm_server.py (e.g. http://127.0.0.1:8000/v1) for offline runs
+BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
-def simplify_signature(sig):
-    """
-    Removes generic type parameters from the method signature.
-    Example: clustering(ArrayList<IArtifact>) -> clustering(ArrayList)
-    """
-    sig = re.sub(r'<[^>]+>', '', sig)
-    # Remove #RAW suffix if present
-    sig = sig.replace("#RAW", "")
-    return sig
+def get_api_key():
+    # Local stand-ins do not check the key, but the client refuses to start without one
+    return os.getenv("OPENAI_API_KEY") or ("local" if BASE_URL else None)
 
-def get_context_filename(class_name, function_name):
-    """
-    Generates the context filename based on class and function name.
-    """
-    # First, simplify the signature to match what run_chatunitest.py does
-    simplified_func_name = simplify_signature(function_name)
-    
-    # Replace common special characters with underscores to match file naming convention
-    # Example: start(String[]) -> start_String___
-    safe_func_name = simplified_func_name
-    replacements = {
-        "(": "_",
-        ")": "_",
-        "[": "_",
-        "]": "_",
-        "<": "_",
-        ">": "_",
-        ", ": "__",
-        " ": "" # Remove any remaining spaces
-    }
-    
-    for old, new in replacements.items():
-        safe_func_name = safe_func_name.replace(old, new)
-        
-    return f"context_{class_name}_{safe_func_name}.json"
 
 def load_ccg_data(project_name):
     """
-    Loads the CCG data for the given project.
+    Opens the CCG data for the given project. Graphs are served lazily from an
+    indexed SQLite store that is built next to the JSON file on first use.
     """
     ccg_path = os.path.join(CCGS_DIR, f"{project_name}_ccg.json")
     if os.path.exists(ccg_path):
-        print(f"  Loading CCG data from {ccg_path}...")
-        with open(ccg_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        print(f"  Opening CCG store for {ccg_path}...")
+        return open_ccg_store(ccg_path)
     print(f"  Warning: CCG file not found: {ccg_path}")
-    return []
-
-def find_matching_ccg(method_data, ccg_list):
-    """
-    Finds the matching CCG entry for the given method.
-    """
-    class_name = method_data['class_name']
-    function_name = method_data['function_name']
-    
-    # Extract simple method name (e.g., "init" from "init()")
-    simple_method_name = function_name.split('(')[0]
-    
-    # Convert class name to path suffix (e.g., "a.b.C" -> "a/b/C.java")
-    path_suffix = class_name.replace('.', '/') + ".java"
-    path_suffix_win = class_name.replace('.', '\\') + ".java"
-    
-    candidates = []
-    for ccg in ccg_list:
-        if ccg['method_name'] == simple_method_name:
-            # Check file path
-            ccg_path = ccg['file_path']
-            # Normalize separators for comparison
-            norm_ccg_path = ccg_path.replace('\\', '/')
-            norm_suffix = path_suffix.replace('\\', '/')
-            
-            if norm_ccg_path.endswith(norm_suffix):
-                candidates.append(ccg)
-    
-    if not candidates:
-        return None
-        
-    if len(candidates) == 1:
-        return candidates[0]
-        
-    # If multiple candidates, try to match by line numbers
-    if 'code_lines' in method_data and method_data['code_lines']:
-        method_start = method_data['code_lines'][0]['line']
-        method_end = method_data['code_lines'][-1]['line']
-        
-        for ccg in candidates:
-            # Check if CCG nodes overlap with method lines
-            ccg_lines = [node['line_num'] for node in ccg.get('nodes', [])]
-            if not ccg_lines:
-                continue
-            ccg_start = min(ccg_lines)
-            ccg_end = max(ccg_lines)
-            
-            # Simple overlap check
-            if not (ccg_end < method_start or ccg_start > method_end):
-                return ccg
-                
-    return candidates[0] # Fallback
+    return CCGIndex([])
 
 def load_prompt_template():
     with open(PROMPT_FILE, 'r', encoding='utf-8') as f:
         return f.read()
 
-def slice_method(method_data, dependencies, ccg_data, prompt_template, model="gpt-4o"):
+def get_run_settings(prompt_template, prompt_format):
     """
-    Slices a single method using OpenAI API.
+    Settings that change the responses; a checkpoint written with others is not resumed.
     """
-    # Prepare the focal method JSON string
-    focal_method_str = json.dumps(method_data, indent=2)
-    
-    # Prepare the dependencies JSON string
-    dependencies_str = json.dumps(dependencies, indent=2)
-    
-    # Prepare the CCG JSON string
-    ccg_str = json.dumps(ccg_data, indent=2) if ccg_data else "No CCG available"
+    return {
+        "model": MODEL,
+        "temperature": TEMPERATURE,
+        "max_completion_tokens": MAX_COMPLETION_TOKENS,
+        "system_prompt": SYSTEM_PROMPT,
+        "prompt_format": prompt_format,
+        "prompt_template": hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()
+    }
+
+def render_prompt(method_data, dependencies, ccg_data, prompt_template, prompt_format=None):
+    """
+    Fills the prompt template with the focal method, dependencies and CCG.
+    """
+    if (prompt_format or PROMPT_FORMAT) == "compact":
+        prompt_template = compact_template(prompt_template)
+        focal_method_str = compact_focal_method(method_data)
+        dependencies_str = compact_dependencies(dependencies)
+        ccg_str = compact_ccg(ccg_data, method_data) if ccg_data else "No CCG available"
+    else:
+        # Prepare the focal method JSON string
+        focal_method_str = json.dumps(method_data, indent=2)
+        
+        # Prepare the dependencies JSON string
+        dependencies_str = json.dumps(dependencies, indent=2)
+        
+        # Prepare the CCG JSON string
+        ccg_str = json.dumps(ccg_data, indent=2) if ccg_data else "No CCG available"
     
     # Replace placeholders in the prompt
     prompt = prompt_template.replace("{{ focal method }}", focal_method_str)
     prompt = prompt.replace("{{ dependencies }}", dependencies_str)
     prompt = prompt.replace("{{ code_context_graph }}", ccg_str)
+    return prompt
+
+def report_static_prefix(prompt_template):
+    """
+    Provider-side prompt caching reuses the longest shared prefix of a request, so the
+    system message and the template text before the first placeholder must come first.
+    """
+    first_placeholder = prompt_template.find("{{")
+    static_text = prompt_template if first_placeholder == -1 else prompt_template[:first_placeholder]
+    static_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(static_text)
+    total_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(prompt_template)
+    print(f"  Static prompt prefix: {static_tokens} of {total_tokens} template tokens")
+    return static_tokens
+
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_response(content, function_name):
+    """
+    Splits a completion into the markdown analysis and the JSON slice list.
+    """
+    result = {
+        "full_response": content,
+        "analysis": "",
+        "slices": []
+    }
     
+    # Extract JSON part
+    json_start = content.find("```json")
+    if json_start != -1:
+        result["analysis"] = content[:json_start].strip()
+        json_start = content.find("\n", json_start) + 1
+        json_end = content.find("```", json_start)
+        json_str = content[json_start:json_end].strip()
+        try:
+            result["slices"] = json.loads(json_str)
+        except json.JSONDecodeError as e:
+            print(f"  Warning: Failed to parse JSON for {function_name}: {e}")
+            print(f"Response content: {content}")
+    else:
+        result["analysis"] = content
+        
+    return result
+
+async def stream_completion(async_client, messages, model, function_name, info=None):
+    """
+    Streams one completion through StreamingSliceParser. Slices are parsed as they
+    arrive; generation is aborted when the analysis runs too long or the JSON block
+    is malformed (raises a retryable SliceError). After the slice array is closed
+    the stream is only drained for the final usage chunk.
+    Usage, finish reason and time to first token are stored in `info` for telemetry.
+    """
+    info = info if info is not None else {}
+    parser = StreamingSliceParser(MAX_ANALYSIS_CHARS)
+    started = time.monotonic()
+    first_slice_at = None
+
+    stream = await async_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=TEMPERATURE,
+        max_completion_tokens=MAX_COMPLETION_TOKENS,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
     try:
-        response = client.chat.completions.create(
+        async for chunk in stream:
+            if getattr(chunk, 'usage', None):
+                info["usage"] = chunk.usage
+            if not chunk.choices:
+                continue
+            if getattr(chunk.choices[0], 'finish_reason', None):
+                info["finish_reason"] = chunk.choices[0].finish_reason
+            if parser.done:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta and "first_token" not in info:
+                info["first_token"] = time.monotonic() - started
+            completed = parser.feed(delta)
+            if completed and first_slice_at is None:
+                first_slice_at = time.monotonic() - started
+            if parser.error:
+                info["finish_reason"] = "aborted"
+                break
+    finally:
+        # Closing the stream early stops generation on the provider side
+        await stream.close()
+
+    if parser.error:
+        print(f"  Warning: Aborted response for {function_name} after {len(parser.content)} chars: {parser.error}")
+        raise SliceError("parse", parser.error, response={"full_response": parser.content, "analysis": ""})
+    if first_slice_at is not None:
+        print(f"    First slice for {function_name} after {first_slice_at:.2f}s")
+    if parser.done:
+        return parser.result()
+    # Stream ended without a complete slice array; fall back to the regular parser
+    return parse_response(parser.content, function_name)
+
+async def slice_method_async(async_client, limiter, method_data, prompt, model=None, prompt_tokens=None,
+                             info=None):
+    """
+    Slices a single method. Waits for rate-limit capacity before sending.
+    Errors are raised (not swallowed) so the retry scheduler can classify them.
+    Call details for telemetry are stored in `info` when given.
+    """
+    info = info if info is not None else {}
+    model = model or MODEL
+    messages = build_messages(prompt)
+    if prompt_tokens is None:
+        prompt_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(prompt)
+    # Providers count max_completion_tokens against the tokens/min budget up front
+    await limiter.acquire(prompt_tokens + MAX_COMPLETION_TOKENS)
+    info["sent_at"] = time.monotonic()
+
+    if STREAMING:
+        result = await stream_completion(async_client, messages, model, method_data.get('function_name'), info)
+    else:
+        response = await async_client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert in software engineering and code refactoring, specialized in analyzing and decomposing complex methods."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_completion_tokens=4096
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_completion_tokens=MAX_COMPLETION_TOKENS
         )
+        record_response_info(response, info)
 
-        # Defensive: ensure response has choices
         if not response or not getattr(response, 'choices', None) or len(response.choices) == 0:
-            print(f"  Warning: Empty or malformed response for {method_data.get('function_name')}")
-            return None
+            raise SliceError("transient", "empty or malformed response")
 
         content = response.choices[0].message.content
-        
-        # Parse response
-        result = {
-            "full_response": content,
-            "analysis": "",
-            "slices": []
-        }
-        
-        # Extract JSON part
-        json_start = content.find("```json")
-        if json_start != -1:
-            result["analysis"] = content[:json_start].strip()
-            json_start = content.find("\n", json_start) + 1
-            json_end = content.find("```", json_start)
-            json_str = content[json_start:json_end].strip()
-            try:
-                result["slices"] = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"  Warning: Failed to parse JSON for {method_data.get('function_name')}: {e}")
-                print(f"Response content: {content}")
+        result = parse_response(content or "", method_data.get('function_name'))
+
+    if not result["slices"]:
+        raise SliceError("parse", "no slices in response", response=result)
+    return result
+
+def record_response_info(response, info):
+    """
+    Copies usage and finish reason of a non-streamed response into `info`.
+    """
+    info["usage"] = getattr(response, 'usage', None)
+    choices = getattr(response, 'choices', None) or []
+    if choices:
+        info["finish_reason"] = getattr(choices[0], 'finish_reason', None)
+
+def tracked(tracker, kind, key, call):
+    """
+    Returns the awaitable for call(info), recorded by tracker when one is given.
+    """
+    if tracker is None:
+        return call({})
+    return tracker.track(kind, key, call)
+
+def build_job_prompt(job, prompt_template, prompt_format=None):
+    """
+    Renders the prompt for one job within the token budget.
+    Returns (prompt, degradation).
+    """
+    return build_budgeted_prompt(
+        lambda m, deps, ccg: render_prompt(m, deps, ccg, prompt_template, prompt_format),
+        job["method"], job["dependencies"], job["ccg_data"], SYSTEM_PROMPT, MAX_COMPLETION_TOKENS,
+        CONTEXT_WINDOW, DD_MAX_HOPS)
+
+async def slice_with_retries(async_client, limiter, scheduler, job, prompt_template, cache=None, prompt_format=None,
+                             tracker=None):
+    """
+    Runs slice_method_async for one job under the retry scheduler.
+    Responses are served from / stored into the response cache when one is given.
+    Returns (result, None) on success and (None, SliceError) on failure.
+    """
+    method = job["method"]
+    key = f"{method['class_name']}::{method['function_name']}"
+    prompt, degradation = build_job_prompt(job, prompt_template, prompt_format)
+    if degradation.get("over_budget"):
+        print(f"    Warning: Prompt for {key} exceeds the context budget even at level {degradation['level']}")
+    elif degradation["level"] > 0:
+        print(f"    Prompt over budget for {key}; degraded to level {degradation['level']} ({degradation['name']})")
+
+    result = None
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(build_messages(prompt), MODEL, TEMPERATURE, MAX_COMPLETION_TOKENS)
+        cached = cache.get(cache_key)
+        # An entry without slices (e.g. seeded from an unparsable batch result) is a miss
+        if cached is not None and cached.get("slices"):
+            print(f"  Cached: {key}")
+            result = dict(cached)
+
+    if result is None:
+        if async_client is None:
+            print(f"  Not in cache (replay only): {key}")
+            return None, SliceError("cache_miss", "not in cache (replay only)")
+
+        print(f"  Analyzing: {key}")
+        try:
+            result = await scheduler.run(
+                lambda: tracked(tracker, "slice", key, lambda info: slice_method_async(
+                    async_client, limiter, method, prompt, prompt_tokens=degradation["prompt_tokens"], info=info)),
+                key)
+        except SliceError as e:
+            return None, e
+        if cache is not None:
+            cache.put(cache_key, result)
+
+    # The cache holds the raw response; validation and repair (itself cached) run on every use
+    result = await validate_and_repair(async_client, limiter, scheduler, method, result, cache, tracker)
+    result["prompt_degradation"] = degradation
+    return result, None
+
+async def request_repair(async_client, limiter, prompt, info=None):
+    """
+    Sends one repair prompt and returns its slices in the shape of parse_response.
+    """
+    info = info if info is not None else {}
+    await limiter.acquire(count_tokens(SYSTEM_PROMPT) + count_tokens(prompt) + REPAIR_MAX_COMPLETION_TOKENS)
+    info["sent_at"] = time.monotonic()
+    response = await async_client.chat.completions.create(
+        model=MODEL,
+        messages=build_messages(prompt),
+        temperature=TEMPERATURE,
+        max_completion_tokens=REPAIR_MAX_COMPLETION_TOKENS
+    )
+    record_response_info(response, info)
+    if not response or not getattr(response, 'choices', None) or len(response.choices) == 0:
+        raise SliceError("transient", "empty or malformed repair response")
+    content = response.choices[0].message.content or ""
+    slices = parse_repair_response(content)
+    if slices is None:
+        raise SliceError("parse", "repair response is not a JSON slice list")
+    return {"full_response": content, "analysis": "", "slices": slices}
+
+async def validate_and_repair(async_client, limiter, scheduler, method, result, cache=None, tracker=None):
+    """
+    Validates the slices against code_lines. When they break the coverage, overlap
+    or brace rules, asks only for the broken ranges and merges the answer if it
+    leaves fewer problems. The report is stored under result["validation"].
+    """
+    key = f"{method['class_name']}::{method['function_name']}"
+    report = validate_slices(result["slices"], method)
+    if report["valid"] or not REPAIR_ENABLED:
+        return dict(result, validation=report)
+
+    print(f"    Invalid slices for {key}: {problem_count(report)} problems; requesting a repair")
+    prompt = build_repair_prompt(method, result["slices"], report)
+    cache_key = None
+    repair = None
+    if cache is not None:
+        cache_key = make_cache_key(build_messages(prompt), MODEL, TEMPERATURE, REPAIR_MAX_COMPLETION_TOKENS)
+        repair = cache.get(cache_key)
+    if repair is None and async_client is not None:
+        try:
+            repair = await scheduler.run(
+                lambda: tracked(tracker, "repair", key, lambda info: request_repair(async_client, limiter, prompt, info)),
+                f"{key} (repair)")
+        except SliceError as e:
+            print(f"    Repair failed for {key}: {e}")
         else:
-            result["analysis"] = content
-            
+            if cache is not None:
+                cache.put(cache_key, repair)
+
+    if repair is not None:
+        merged = merge_repair(result["slices"], repair["slices"], report)
+        merged_report = validate_slices(merged, method)
+        if problem_count(merged_report) < problem_count(report):
+            print(f"    Repaired {key}: {problem_count(report)} -> {problem_count(merged_report)} problems")
+            merged_report["repaired_from"] = {k: v for k, v in report.items() if k != "valid"}
+            return dict(result, slices=merged, validation=merged_report)
+        print(f"    Repair for {key} did not reduce the problems; keeping the original slices")
+    return dict(result, validation=report)
+
+async def slice_jobs_async(jobs, prompt_template, concurrency=MAX_CONCURRENCY, cache=None, replay_only=False,
+                           on_result=None, prompt_format=None, tracker=None):
+    """
+    Slices all jobs concurrently. Results are returned in job order.
+    In replay-only mode no client is created and only cached responses are returned.
+    on_result(job, result, error) is called as soon as each job finishes.
+    Token usage of every call is recorded in tracker when one is given.
+    """
+    # The client's own retries would hide 429s from the scheduler
+    async_client = None if replay_only else AsyncOpenAI(api_key=get_api_key(), base_url=BASE_URL, max_retries=0)
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    scheduler = RetryScheduler(MAX_RETRIES, INITIAL_RETRY_DELAY, BACKOFF_FACTOR, MAX_RETRY_DELAY,
+                               BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+    async def worker(index, job):
+        result, error = await slice_with_retries(async_client, limiter, scheduler, job, prompt_template,
+                                                 cache, prompt_format, tracker)
+        if on_result is not None:
+            on_result(job, result, error)
         return result
-        
-    except Exception as e:
-        print(f"  Error calling API: {e}")
+
+    try:
+        return await run_ordered(jobs, worker, concurrency)
+    finally:
+        if async_client is not None:
+            await async_client.close()
+            print(f"  Retry scheduler: {scheduler.summary()}")
+            if tracker is not None:
+                print(f"  Usage: {tracker.format_summary()}")
+
+def load_dependencies(context_store, class_name, function_name):
+    dependencies = context_store.get(class_name, function_name) if context_store is not None else None
+    if dependencies is not None:
+        return dependencies
+    print(f"    Warning: Context not found: {class_name}::{function_name}")
+    return {"message": "Context information not available"}
+
+def describe_failure(error):
+    if error is None:
         return None
+    if error.kind == "cache_miss":
+        return "Error: not in cache (replay only)"
+    if error.kind == "fatal":
+        return f"Error: not retried ({error})"
+    if error.kind == "circuit_open":
+        return "Error: skipped while the circuit breaker was open"
+    return f"Error: failed after retries ({error.kind}: {error})"
 
-def process_project(project_name):
-    print(f"Processing project: {project_name}")
+def build_method_result(method, result, error="Error: failed after retries", error_kind=None, response=None):
+    if result:
+        # Combine original method info with result
+        method_result = {
+            "class_name": method['class_name'],
+            "function_name": method['function_name'],
+            "analysis": result["analysis"],
+            "slices": result["slices"],
+            "full_response": result["full_response"]
+        }
+        for field in ("prompt_degradation", "deduplicated_from", "validation"):
+            if field in result:
+                method_result[field] = result[field]
+        return method_result
+    # After retries still failed — record a stub result so we know it failed
+    print(f"    {error}: {method['class_name']}::{method['function_name']}")
+    method_result = {
+        "class_name": method['class_name'],
+        "function_name": method['function_name'],
+        "analysis": error,
+        "slices": [],
+        "full_response": ""
+    }
+    if response:
+        # The provider answered but the answer was rejected: keep it for inspection
+        method_result.update(analysis=response.get("analysis", ""), full_response=response.get("full_response", ""),
+                             error=error)
+    if error_kind:
+        method_result["error_kind"] = error_kind
+    return method_result
+
+def load_project_jobs(project_name):
+    """
+    Loads the oracle methods of a project together with their dependencies and CCG.
+    Returns None when the project has no oracle_methods.json.
+    """
     project_dir = os.path.join(REPOS_DIR, project_name)
     oracle_methods_path = os.path.join(project_dir, "oracle_methods.json")
-    context_dir = os.path.join(project_dir, "target", "chatunitest-info")
-    output_path = os.path.join(project_dir, "LLM_slices.json")
-    
+
     if not os.path.exists(oracle_methods_path):
         print(f"  oracle_methods.json not found in {project_dir}")
-        return
+        return None
 
     with open(oracle_methods_path, 'r', encoding='utf-8') as f:
         methods = json.load(f)
     
-    # Load CCG data for the project
-    ccg_list = load_ccg_data(project_name)
-    
-    prompt_template = load_prompt_template()
+    # Load CCG data for the project (indexed once, looked up per method)
+    ccg_index = load_ccg_data(project_name)
+    context_store = None
+    try:
+        # Contexts are looked up by (class, signature) in the project's context store
+        context_store = open_context_store(get_context_dir(project_dir))
+
+        # Gather everything each request needs up front (cheap, local I/O)
+        jobs = []
+        for method in methods:
+            class_name = method['class_name']
+            function_name = method['function_name']
+
+            # Find matching CCG
+            ccg_data = ccg_index.lookup(method)
+            if not ccg_data:
+                print(f"    Warning: No matching CCG found for {class_name}::{function_name}")
+
+            dependencies = load_dependencies(context_store, class_name, function_name)
+            jobs.append({"method": method, "dependencies": dependencies, "ccg_data": ccg_data})
+    finally:
+        ccg_index.close()
+        if context_store is not None:
+            context_store.close()
+    return jobs
+
+def plan_requests(jobs, completed, dedup=True):
+    """
+    Decides which pending jobs are sent to the LLM.
+    Returns (request_jobs, followers, reusable):
+      followers maps id(representative job) -> duplicate jobs that reuse its result,
+      reusable lists (job, completed_result, source_method) for duplicates of methods
+      already completed in the checkpoint.
+    """
+    def key_of(job):
+        return method_key(job["method"]['class_name'], job["method"]['function_name'])
+
+    groups = group_duplicates(jobs) if dedup else [[i] for i in range(len(jobs))]
+    request_jobs, followers, reusable = [], {}, []
+    for group in groups:
+        members = [jobs[i] for i in group]
+        pending = [job for job in members if key_of(job) not in completed]
+        if not pending:
+            continue
+        done = [job for job in members if completed.get(key_of(job), {}).get('slices')]
+        if done:
+            source = done[0]
+            reusable.extend((job, completed[key_of(source)], source["method"]) for job in pending)
+            continue
+        request_jobs.append(pending[0])
+        if len(pending) > 1:
+            followers[id(pending[0])] = pending[1:]
+    # Keep the original oracle order for the requests
+    order = {id(job): i for i, job in enumerate(jobs)}
+    request_jobs.sort(key=lambda job: order[id(job)])
+    return request_jobs, followers, reusable
+
+def process_project(project_name, use_cache=CACHE_ENABLED, replay_only=REPLAY_ONLY, prompt_format=PROMPT_FORMAT,
+                    dedup=DEDUP, output_path=None):
+    print(f"Processing project: {project_name}")
+    project_dir = os.path.join(REPOS_DIR, project_name)
+    # The checkpoint and telemetry files are kept next to the output
+    output_path = output_path or os.path.join(project_dir, "LLM_slices.json")
     
-    all_results = []
+    jobs = load_project_jobs(project_name)
+    if jobs is None:
+        return
+    methods = [job["method"] for job in jobs]
     
-    # Check if output already exists to resume or append? 
-    # For now, we'll start fresh or maybe just process a few for testing if needed.
-    # But the user asked to process "all methods".
+    prompt_template = load_prompt_template()
+    report_static_prefix(prompt_template)
     
     # LIMIT for testing purposes (remove or set to None for full run)
-    # methods = methods[:1] 
-    
-    for method in methods:
-        class_name = method['class_name']
-        function_name = method['function_name']
-        
-        print(f"  Analyzing: {class_name}::{function_name}")
-        
-        # Find matching CCG
-        ccg_data = find_matching_ccg(method, ccg_list)
-        if not ccg_data:
-            print(f"    Warning: No matching CCG found for {class_name}::{function_name}")
-        
-        context_filename = get_context_filename(class_name, function_name)
-        context_path = os.path.join(context_dir, context_filename)
-        
-        dependencies = {}
-        if os.path.exists(context_path):
-            with open(context_path, 'r', encoding='utf-8') as f:
-                dependencies = json.load(f)
-        else:
-            print(f"    Warning: Context file not found: {context_filename}")
-            dependencies = {"message": "Context information not available"}
-
-        result = slice_method(method, dependencies, ccg_data, prompt_template)
-
-        # If initial call failed (None), retry with exponential backoff
-        if result is None:
-            retries = 0
-            delay = INITIAL_RETRY_DELAY
-            while retries < MAX_RETRIES and result is None:
-                retries += 1
-                print(f"    Retry {retries}/{MAX_RETRIES} for {class_name}::{function_name} after {delay}s")
-                time.sleep(delay)
-                result = slice_method(method, dependencies, ccg_data, prompt_template)
-                delay *= BACKOFF_FACTOR
-
-        if result:
-            # Combine original method info with result
-            method_result = {
-                "class_name": class_name,
-                "function_name": function_name,
-                "analysis": result["analysis"],
-                "slices": result["slices"],
-                "full_response": result["full_response"]
-            }
-            all_results.append(method_result)
-        else:
-            # After retries still failed — record a stub result so we know it failed
-            print(f"    Failed after {MAX_RETRIES} retries: {class_name}::{function_name}")
-            method_result = {
-                "class_name": class_name,
-                "function_name": function_name,
-                "analysis": "Error: failed after retries",
-                "slices": [],
-                "full_response": ""
-            }
-            all_results.append(method_result)
-            
-        # Sleep briefly to avoid rate limits if necessary
-        # time.sleep(0.5) 
-
-    # Save results
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_results, f, indent=2, ensure_ascii=False)
+    # jobs = jobs[:1] 
+
+    # Resume: skip methods already recorded in the checkpoint of an interrupted run
+    # (or of a run that ended with retryable failures)
+    checkpoint_path = get_checkpoint_path(output_path)
+    run_settings = get_run_settings(prompt_template, prompt_format)
+    completed = load_checkpoint(checkpoint_path, run_settings)
+    pending_jobs = [job for job in jobs
+                    if method_key(job["method"]['class_name'], job["method"]['function_name']) not in completed]
+    if completed:
+        print(f"  Resuming from {checkpoint_path}: {len(completed)} done, {len(pending_jobs)} remaining")
+
+    cache = None
+    if use_cache or replay_only:
+        cache = ResponseCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+
+    failed = {}
+
+    with CheckpointWriter(checkpoint_path, run_settings) as checkpoint:
+        def record(job, result, error):
+            method_result = build_method_result(job["method"], result, describe_failure(error),
+                                                error.kind if error else None,
+                                                error.response if error else None)
+            key = method_key(job["method"]['class_name'], job["method"]['function_name'])
+            if result or error.kind == "fatal":
+                # Non-retryable failures would fail the same way again, so they are final
+                checkpoint.append(method_result)
+            else:
+                # Other failures are not checkpointed so that a resumed run retries them
+                failed[key] = method_result
+
+        request_jobs, followers, reusable = plan_requests(jobs, completed, dedup)
+        saved = len(pending_jobs) - len(request_jobs)
+        if saved:
+            print(f"  Dedup: {len(request_jobs)} requests for {len(pending_jobs)} methods ({saved} duplicates reuse a result)")
+        for job, source_result, source_method in reusable:
+            record(job, fan_out(source_result, source_method, job["method"]), None)
+
+        def record_group(job, result, error):
+            record(job, result, error)
+            for duplicate in followers.get(id(job), []):
+                if result:
+                    copied = fan_out(result, job["method"], duplicate["method"])
+                    copied["prompt_degradation"] = result.get("prompt_degradation")
+                    copied["validation"] = validate_slices(copied["slices"], duplicate["method"])
+                    record(duplicate, copied, None)
+                else:
+                    record(duplicate, None, error)
+
+        # Run the LLM calls concurrently; every finished method is checkpointed immediately
+        print(f"  Slicing {len(request_jobs)} methods (concurrency={MAX_CONCURRENCY})...")
+        # Per-call telemetry is appended to LLM_slices.telemetry.jsonl (see telemetry_report.py)
+        with UsageTracker(MODEL, get_telemetry_path(output_path), project_name) as tracker:
+            asyncio.run(slice_jobs_async(request_jobs, prompt_template, cache=cache, replay_only=replay_only,
+                                         on_result=record_group, prompt_format=prompt_format, tracker=tracker))
+
+    if cache is not None:
+        print(f"  Cache: {cache.hits} hits, {cache.misses} misses")
+
+    # Compact the checkpoint into the final LLM_slices.json, in oracle order
+    ordered_keys = [method_key(m['class_name'], m['function_name']) for m in methods]
+    compact_checkpoint(checkpoint_path, output_path, ordered_keys, failed)
     print(f"  Saved results to {output_path}")
+    return {"methods": len(methods), "failed": len(failed), "usage": tracker.summary()}
+
+
+def run_project_worker(project_name, options):
+    """
+    Process-pool entry point. Module settings changed on the command line are
+    re-applied here because worker processes do not inherit them, and the
+    provider rate limits are split evenly between the parallel projects.
+    """
+    global BASE_URL, STREAMING, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, MODEL, TEMPERATURE
+    BASE_URL = options["base_url"]
+    MODEL = options["model"]
+    TEMPERATURE = options["temperature"]
+    STREAMING = options["streaming"]
+    REQUESTS_PER_MINUTE = max(1, options["requests_per_minute"] // options["workers"])
+    TOKENS_PER_MINUTE = max(1, options["tokens_per_minute"] // options["workers"])
+    return process_project(project_name, use_cache=options["use_cache"], replay_only=options["replay_only"],
+                           prompt_format=options["prompt_format"], dedup=options["dedup"])
 
 def main():
-    projects = [d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d))]
-    
-    for project in projects:
-        process_project(project)
+    global BASE_URL, STREAMING, MODEL, TEMPERATURE
+    parser = argparse.ArgumentParser(description="Slice oracle methods with an LLM.")
+    parser.add_argument("projects", nargs="*", help="Projects to process (default: all under repositories/)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    parser.add_argument("--replay-only", action="store_true", help="Serve responses from the cache only; never call the API")
+    parser.add_argument("--prompt-format", choices=["json", "compact"], default=PROMPT_FORMAT,
+                        help="How the focal method, dependencies and CCG are serialized into the prompt")
+    parser.add_argument("--no-dedup", action="store_true", help="Send every method, even those with identical bodies")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for complete responses instead of streaming")
+    parser.add_argument("--model", default=MODEL, help="Chat model used for slicing")
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="OpenAI-compatible API base URL, e.g. http://127.0.0.1:8000/v1 for mock_llm_server.py")
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+    BASE_URL = args.base_url
+    MODEL = args.model
+    TEMPERATURE = args.temperature
+    STREAMING = STREAMING and not args.no_stream
+
+    projects = args.projects or [d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d))]
+    workers = resolve_workers(args.workers, projects)
+
+    options = {
+        "base_url": BASE_URL,
+        "model": MODEL,
+        "temperature": TEMPERATURE,
+        "streaming": STREAMING,
+        "requests_per_minute": REQUESTS_PER_MINUTE,
+        "tokens_per_minute": TOKENS_PER_MINUTE,
+        "workers": min(workers, len(projects)) or 1,
+        "use_cache": CACHE_ENABLED and not args.no_cache,
+        "replay_only": REPLAY_ONLY or args.replay_only,
+        "prompt_format": args.prompt_format,
+        "dedup": DEDUP and not args.no_dedup,
+    }
+    run_projects(functools.partial(run_project_worker, options=options), projects, workers,
+                 log_dir=args.log_dir or os.path.join(BASE_DIR, "logs"), label="slice")
 
 if __name__ == "__main__":
     main()
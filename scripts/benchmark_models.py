@@ -0,0 +1,172 @@
+# Model comparison benchmark for slicing.
+# Runs the oracle methods of every project through batch_slice_methods.py once per
+# model configuration, scores each output with the evaluate_slices.py categories
+# ("Inside One LLM Slice", "Covers Multiple", ...) and reports slice quality against
+# tokens, cost and wall time per model. Outputs go to benchmarks/<run>/<config>/<project>/
+# so the LLM_slices.json files used by the rest of the pipeline are left untouched.
+#
+# Usage:
+#   python benchmark_models.py                                      # gpt-4o vs gpt-4o-mini, all projects
+#   python benchmark_models.py junit3.8 --models gpt-4o gpt-4o-mini --temperatures 0 0.3
+#   python benchmark_models.py --mock                                # offline, against mock_llm_server.py
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+
+import batch_slice_methods as bsm
+from evaluate_slices import PROJECTS, categorize_snippets, load_json
+from usage_tracker import make_run_id
+
+DEFAULT_MODELS = ["gpt-4o", "gpt-4o-mini"]
+DEFAULT_TEMPERATURES = [0.3]
+CATEGORIES = ["Inside One LLM Slice", "Covers Multiple", "Partial Overlap with One", "No Match", "Method Not Found"]
+
+
+def config_label(model, temperature):
+    return f"{model}@t{temperature:g}"
+
+
+def start_mock_server(latency_mean, seed):
+    """
+    Serves mock_llm_server.py on a free local port in a background thread.
+    Returns (server, base_url).
+    """
+    from mock_llm_server import LatencyModel, MockState, load_oracle_methods, make_server
+
+    methods = load_oracle_methods(bsm.REPOS_DIR)
+    latency = LatencyModel("lognormal", latency_mean, 0.3, rng=random.Random(seed))
+    server = make_server("127.0.0.1", 0, MockState(methods, latency, seed=seed))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    print(f"Mock LLM server with {len(methods)} oracle methods on http://{host}:{port}/v1")
+    return server, f"http://{host}:{port}/v1"
+
+
+def add_totals(totals, values):
+    for k, v in values.items():
+        if isinstance(v, (int, float)):
+            totals[k] = totals.get(k, 0) + v
+
+
+def run_config(model, temperature, projects, out_dir, use_cache, prompt_format, dedup):
+    """
+    Slices and evaluates every project with one model configuration.
+    """
+    bsm.MODEL = model
+    bsm.TEMPERATURE = temperature
+    label = config_label(model, temperature)
+    stats = {}
+    usage = {}
+    result = {"model": model, "temperature": temperature, "projects": {}}
+    wall = 0.0
+    methods = 0
+
+    for project in projects:
+        print(f"\n--- {label}: {project} ---")
+        output_path = os.path.join(out_dir, label, project, "LLM_slices.json")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        started = time.monotonic()
+        try:
+            run = bsm.process_project(project, use_cache=use_cache, prompt_format=prompt_format, dedup=dedup,
+                                      output_path=output_path)
+        except Exception as e:
+            print(f"  Error: {label} failed on {project}: {e}")
+            result["projects"][project] = {"error": str(e)}
+            continue
+        elapsed = time.monotonic() - started
+        if not run or not os.path.exists(output_path):
+            result["projects"][project] = {"error": "no output"}
+            continue
+
+        snippets = load_json(os.path.join(bsm.REPOS_DIR, project, "oracle_snippets.json"))
+        categories, _ = categorize_snippets(snippets, load_json(output_path))
+        result["projects"][project] = {
+            "categories": categories,
+            "methods": run["methods"],
+            "failed": run["failed"],
+            "usage": run["usage"],
+            "wall_seconds": round(elapsed, 2)
+        }
+        add_totals(stats, categories)
+        add_totals(usage, run["usage"])
+        wall += elapsed
+        methods += run["methods"]
+
+    total = stats.get("Total Snippets", 0)
+    result["categories"] = stats
+    result["quality"] = {k: (stats.get(k, 0) / total if total else 0.0) for k in CATEGORIES}
+    result["usage"] = {k: round(v, 4) if isinstance(v, float) else v for k, v in usage.items()}
+    result["methods"] = methods
+    result["wall_seconds"] = round(wall, 2)
+    result["methods_per_minute"] = methods * 60.0 / wall if wall else None
+    return result
+
+
+def print_report(results):
+    print("\n=== Model Comparison ===")
+    header = (f"{'config':<24}{'inside one':>11}{'covers mult':>12}{'partial':>9}{'no match':>10}"
+              f"{'tokens':>11}{'cost $':>9}{'wall s':>9}{'meth/min':>10}")
+    print(header)
+    print("-" * len(header))
+    for label, r in results.items():
+        q = r["quality"]
+        usage = r["usage"]
+        tokens = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        cost = f"{usage['cost_usd']:.4f}" if "cost_usd" in usage else "n/a"
+        rate = f"{r['methods_per_minute']:.1f}" if r["methods_per_minute"] else "n/a"
+        print(f"{label:<24}{q['Inside One LLM Slice']:>11.1%}{q['Covers Multiple']:>12.1%}"
+              f"{q['Partial Overlap with One']:>9.1%}{q['No Match']:>10.1%}"
+              f"{tokens:>11}{cost:>9}{r['wall_seconds']:>9.1f}{rate:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare slicing quality, tokens and wall time across models.")
+    parser.add_argument("projects", nargs="*", default=PROJECTS, help="Projects to benchmark (default: all)")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--temperatures", nargs="+", type=float, default=DEFAULT_TEMPERATURES)
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Reuse cached responses (by default every configuration calls the model)")
+    parser.add_argument("--prompt-format", choices=["json", "compact"], default=bsm.PROMPT_FORMAT)
+    parser.add_argument("--no-dedup", action="store_true", help="Send every method, even those with identical bodies")
+    parser.add_argument("--base-url", default=bsm.BASE_URL, help="OpenAI-compatible API base URL")
+    parser.add_argument("--mock", action="store_true", help="Benchmark against an in-process mock_llm_server.py")
+    parser.add_argument("--mock-latency", type=float, default=0.5, help="Median mock latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", help="Output directory (default: <base>/benchmarks/<run id>)")
+    args = parser.parse_args()
+
+    server = None
+    if args.mock:
+        server, bsm.BASE_URL = start_mock_server(args.mock_latency, args.seed)
+    else:
+        bsm.BASE_URL = args.base_url
+    if not bsm.get_api_key():
+        sys.exit("OPENAI_API_KEY is not set; use --mock or --base-url to benchmark offline")
+
+    out_dir = args.out_dir or os.path.join(bsm.BASE_DIR, "benchmarks", make_run_id())
+    results = {}
+    try:
+        for model in args.models:
+            for temperature in args.temperatures:
+                results[config_label(model, temperature)] = run_config(
+                    model, temperature, args.projects, out_dir, args.use_cache, args.prompt_format,
+                    not args.no_dedup)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print_report(results)
+    report_path = os.path.join(out_dir, "report.json")
+    os.makedirs(out_dir, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Index over a project's Code Context Graphs (CCGs), built once per project.
+# Replaces the per-method linear scan over every CCG entry.
+from collections import defaultdict
+
+
+def normalize_path(path):
+    """
+    Normalizes a CCG file_path ("./repositories/X\\src\\a\\B.java") to "repositories/X/src/a/B.java".
+    """
+    path = path.replace('\\', '/')
+    while path.startswith('./'):
+        path = path[2:]
+    return path
+
+
+def class_to_path_suffix(class_name):
+    """
+    "a.b.C" -> "a/b/C.java". Inner classes ("a.b.C$Inner") live in the outer class file.
+    """
+    parts = class_name.split('.')
+    if '$' in parts[-1]:
+        parts[-1] = parts[-1].split('$')[0]
+    return '/'.join(parts) + ".java"
+
+
+def _squash(text):
+    # Whitespace-insensitive form used to compare CCG statements with source lines
+    return ''.join(text.split())
+
+
+def score_ccg(ccg, code_lines):
+    """
+    Scores how well a CCG fits a method's numbered source lines.
+    CCG node line_num values are relative to the method (1 = declaration line),
+    so node line_num maps to code_lines[line_num - 1]. Each node whose statement
+    appears at its mapped line scores a point; nodes that fall outside the method
+    body count against the candidate.
+    """
+    score = 0
+    for node in ccg.get('nodes', []):
+        rel = node.get('line_num', 0) - 1
+        if rel < 0 or rel >= len(code_lines):
+            score -= 1
+            continue
+        # Statements may be wrapped over several lines; compare a short prefix
+        window = _squash(" ".join(entry['code'] for entry in code_lines[rel:rel + 3]))
+        statement = _squash(node.get('statement', ''))[:30]
+        if statement and statement in window:
+            score += 1
+    return score
+
+
+def resolve_overload(candidates, method_data):
+    """
+    Picks the CCG among same-named candidates by matching CCG statements
+    against the method's own lines.
+    """
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+
+    code_lines = method_data.get('code_lines') or []
+    if not code_lines:
+        return candidates[0]
+    # max() keeps the first candidate on ties, i.e. declaration order in the file
+    return max(candidates, key=lambda ccg: score_ccg(ccg, code_lines))
+
+
+class CCGIndex:
+    """
+    Maps (file name, method name) to the CCG entries declared there, so a
+    method lookup only touches the handful of same-named candidates.
+    """
+    def __init__(self, ccg_list):
+        self._by_name = defaultdict(list)
+        for ccg in ccg_list:
+            norm_path = normalize_path(ccg['file_path'])
+            file_name = norm_path.rsplit('/', 1)[-1]
+            self._by_name[(file_name, ccg['method_name'])].append((norm_path, ccg))
+
+    def close(self):
+        """
+        Nothing to release; present so callers can close a CCGIndex like a CCGStore.
+        """
+
+    def __len__(self):
+        return sum(len(v) for v in self._by_name.values())
+
+    def candidates(self, class_name, method_name):
+        """
+        Returns all CCG entries for method_name declared in the file of class_name.
+        """
+        suffix = class_to_path_suffix(class_name)
+        file_name = suffix.rsplit('/', 1)[-1]
+        return [ccg for norm_path, ccg in self._by_name.get((file_name, method_name), [])
+                if norm_path == suffix or norm_path.endswith('/' + suffix)]
+
+    def lookup(self, method_data):
+        """
+        Finds the CCG entry for an oracle method (class_name, function_name, code_lines).
+        """
+        simple_method_name = method_data['function_name'].split('(')[0]
+        return resolve_overload(self.candidates(method_data['class_name'], simple_method_name), method_data)
@@ -0,0 +1,113 @@
+# SQLite-backed store for Code Context Graphs.
+# convert_ccg_file() turns a project's <project>_ccg.json into <project>_ccg.sqlite once;
+# CCGStore then fetches single method graphs on demand instead of loading the whole file.
+#
+# Usage: python ccg_store.py <ccgs dir or *_ccg.json file> ...
+import os
+import sys
+import json
+import sqlite3
+
+from ccg_index import normalize_path, class_to_path_suffix, resolve_overload
+
+
+def get_store_path(ccg_json_path):
+    """
+    ccgs/X_ccg.json -> ccgs/X_ccg.sqlite
+    """
+    root, _ = os.path.splitext(ccg_json_path)
+    return root + ".sqlite"
+
+
+def convert_ccg_file(ccg_json_path, store_path=None):
+    """
+    Writes every CCG entry of a JSON file into an indexed SQLite store.
+    Each graph is stored as its own JSON blob, keyed by file name and method name.
+    """
+    store_path = store_path or get_store_path(ccg_json_path)
+    with open(ccg_json_path, 'r', encoding='utf-8') as f:
+        ccg_list = json.load(f)
+
+    tmp_path = store_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("""
+            CREATE TABLE ccg (
+                id INTEGER PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                method_name TEXT NOT NULL,
+                norm_path TEXT NOT NULL,
+                graph TEXT NOT NULL
+            )
+        """)
+        rows = []
+        for i, ccg in enumerate(ccg_list):
+            norm_path = normalize_path(ccg['file_path'])
+            rows.append((i, norm_path.rsplit('/', 1)[-1], ccg['method_name'], norm_path,
+                         json.dumps(ccg, separators=(',', ':'), ensure_ascii=False)))
+        conn.executemany("INSERT INTO ccg VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("CREATE INDEX ccg_lookup ON ccg (file_name, method_name)")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, store_path)
+    return len(ccg_list)
+
+
+class CCGStore:
+    """
+    Read-only, lazy counterpart of CCGIndex: only the candidate graphs for the
+    requested method are read and decoded. Exposes the same candidates()/lookup() API.
+    """
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self._conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM ccg").fetchone()[0]
+
+    def candidates(self, class_name, method_name):
+        suffix = class_to_path_suffix(class_name)
+        file_name = suffix.rsplit('/', 1)[-1]
+        rows = self._conn.execute(
+            "SELECT norm_path, graph FROM ccg WHERE file_name = ? AND method_name = ? ORDER BY id",
+            (file_name, method_name))
+        return [json.loads(graph) for norm_path, graph in rows
+                if norm_path == suffix or norm_path.endswith('/' + suffix)]
+
+    def lookup(self, method_data):
+        simple_method_name = method_data['function_name'].split('(')[0]
+        return resolve_overload(self.candidates(method_data['class_name'], simple_method_name), method_data)
+
+
+def open_ccg_store(ccg_json_path):
+    """
+    Opens the SQLite store for a CCG JSON file, (re)building it when it is
+    missing or older than the JSON source.
+    """
+    store_path = get_store_path(ccg_json_path)
+    if not os.path.exists(store_path) or os.path.getmtime(store_path) < os.path.getmtime(ccg_json_path):
+        print(f"  Converting {ccg_json_path} -> {store_path}...")
+        convert_ccg_file(ccg_json_path, store_path)
+    return CCGStore(store_path)
+
+
+def main():
+    paths = sys.argv[1:] or [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ccgs")]
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith("_ccg.json")]
+        else:
+            files = [path]
+        for ccg_json_path in files:
+            count = convert_ccg_file(ccg_json_path)
+            print(f"Converted {ccg_json_path}: {count} method graphs -> {get_store_path(ccg_json_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Naming of the ChatUniTest context files shared by run_chatunitest.py (which
+# produces them) and batch_slice_methods.py (which reads them).
+import os
+import re
+
+CONTEXT_SUBDIR = os.path.join("target", "chatunitest-info")
+
+
+def get_context_dir(project_root):
+    return os.path.join(project_root, CONTEXT_SUBDIR)
+
+
+def simplify_signature(sig):
+    """
+    Removes generic type parameters from the method signature.
+    Example: clustering(ArrayList<IArtifact>) -> clustering(ArrayList)
+    """
+    # Remove content within angle brackets <...>
+    # We use a non-greedy match
+    sig = re.sub(r'<[^>]+>', '', sig)
+    # Remove #RAW suffix if present (found in JHotDraw5.2)
+    sig = sig.replace("#RAW", "")
+    return sig
+
+
+def get_context_filename(class_name, function_name):
+    """
+    Generates the context filename based on class and function name.
+    """
+    # First, simplify the signature the same way it is passed to the tool
+    simplified_func_name = simplify_signature(function_name)
+    
+    # Replace common special characters with underscores to match file naming convention
+    # Example: start(String[]) -> start_String___
+    safe_func_name = simplified_func_name
+    replacements = {
+        "(": "_",
+        ")": "_",
+        "[": "_",
+        "]": "_",
+        "<": "_",
+        ">": "_",
+        ", ": "__",
+        " ": "" # Remove any remaining spaces
+    }
+    
+    for old, new in replacements.items():
+        safe_func_name = safe_func_name.replace(old, new)
+        
+    return f"context_{class_name}_{safe_func_name}.json"
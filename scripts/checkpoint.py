@@ -0,0 +1,122 @@
+# Append-only JSONL checkpoint for batch slicing runs.
+# Every finished method is written as one line immediately, so a crash, Ctrl-C
+# or exhausted quota only loses the calls that were still in flight.
+# The first line is a header with the run settings (model, temperature, prompt
+# format, template hash); a checkpoint written with other settings is discarded.
+import os
+import json
+
+
+def method_key(class_name, function_name):
+    return f"{class_name}::{function_name}"
+
+
+def get_checkpoint_path(output_path):
+    """
+    LLM_slices.json -> LLM_slices.checkpoint.jsonl
+    """
+    root, _ = os.path.splitext(output_path)
+    return root + ".checkpoint.jsonl"
+
+
+def load_checkpoint(checkpoint_path, settings=None):
+    """
+    Returns {class_name::function_name: method_result} for every completed method.
+    A truncated last line (from a crash mid-write) is ignored. When settings are
+    given and differ from the checkpoint header, the checkpoint is removed and
+    nothing is resumed.
+    """
+    completed = {}
+    if not os.path.exists(checkpoint_path):
+        return completed
+    header = None
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"  Warning: Ignoring corrupt checkpoint line in {checkpoint_path}")
+                continue
+            if 'settings' in entry and 'class_name' not in entry:
+                header = entry['settings']
+                continue
+            completed[method_key(entry['class_name'], entry['function_name'])] = entry
+    if settings is not None and header != settings:
+        print(f"  Discarding {checkpoint_path}: it was written with different run settings")
+        os.remove(checkpoint_path)
+        return {}
+    return completed
+
+
+class CheckpointWriter:
+    """
+    Appends one method result per line and forces it to disk. A new checkpoint
+    starts with a header line holding settings.
+    """
+    def __init__(self, checkpoint_path, settings=None):
+        self.path = checkpoint_path
+        is_new = True
+        needs_newline = False
+        if os.path.exists(checkpoint_path) and os.path.getsize(checkpoint_path) > 0:
+            is_new = False
+            with open(checkpoint_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(checkpoint_path, 'a', encoding='utf-8')
+        if needs_newline:
+            # Terminate a line truncated by a crash so new entries start cleanly
+            self._file.write("\n")
+        if is_new and settings is not None:
+            self._write({"settings": settings})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, method_result):
+        self._write(method_result)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compact_checkpoint(checkpoint_path, output_path, ordered_keys, extra_results=None):
+    """
+    Writes the final LLM_slices.json from the checkpoint in oracle order. Keys
+    missing from the checkpoint are taken from extra_results (failure stubs that are
+    intentionally not checkpointed). The checkpoint is removed only when no such
+    stub was written, so that the next run retries the failed methods.
+    """
+    completed = load_checkpoint(checkpoint_path)
+    extra_results = extra_results or {}
+
+    all_results = []
+    retry_pending = False
+    for key in ordered_keys:
+        if key in completed:
+            all_results.append(completed[key])
+        elif key in extra_results:
+            all_results.append(extra_results[key])
+            retry_pending = True
+
+    # Write atomically so the previous output survives a crash during compaction
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(all_results, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+
+    if retry_pending:
+        print(f"  Keeping {checkpoint_path}: the next run retries the failed methods")
+    elif os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return all_results
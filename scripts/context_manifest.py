@@ -0,0 +1,121 @@
+# Manifest of the ChatUniTest context files in target/chatunitest-info, used by
+# run_chatunitest.py to regenerate only what changed.
+# Each context file is recorded with the hash of its class's source file, the method
+# signature passed to the tool and the tool version. The manifest also keeps the hash
+# of every source file (reused while size and mtime are unchanged) and a fingerprint
+# of the whole source tree, so an unchanged project does not need to be parsed again.
+import os
+import json
+import hashlib
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+_tool_versions = {}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_tool_version(jar_path):
+    """
+    The jar's content hash; SNAPSHOT builds keep their file name across rebuilds.
+    """
+    if jar_path not in _tool_versions:
+        try:
+            _tool_versions[jar_path] = file_sha256(jar_path)[:16]
+        except OSError:
+            _tool_versions[jar_path] = "unknown"
+    return _tool_versions[jar_path]
+
+
+def load_manifest(context_dir):
+    path = os.path.join(context_dir, MANIFEST_FILE)
+    empty = {"version": MANIFEST_VERSION, "project_fingerprint": None, "sources": {}, "contexts": {}}
+    if not os.path.exists(path):
+        return empty
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  Warning: Ignoring unreadable manifest {path}: {e}")
+        return empty
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    return manifest
+
+
+def save_manifest(context_dir, manifest):
+    os.makedirs(context_dir, exist_ok=True)
+    path = os.path.join(context_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def hash_sources(src_root, previous=None):
+    """
+    Returns {relative path: {"size", "mtime", "sha256"}} for every .java file under src_root.
+    Hashes from `previous` are reused for files whose size and mtime did not change.
+    """
+    previous = previous or {}
+    sources = {}
+    for root, _, files in os.walk(src_root):
+        for name in files:
+            if not name.endswith(".java"):
+                continue
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, src_root).replace(os.sep, "/")
+            stat = os.stat(path)
+            old = previous.get(rel_path)
+            if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+                sources[rel_path] = old
+            else:
+                sources[rel_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_sha256(path)}
+    return sources
+
+
+def project_fingerprint(sources, tool_version):
+    h = hashlib.sha256(tool_version.encode('utf-8'))
+    for rel_path in sorted(sources):
+        h.update(f"{rel_path}\0{sources[rel_path]['sha256']}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def class_source_path(class_name):
+    """
+    Source file of a class relative to the source root; inner classes map to their outer class.
+    """
+    parts = class_name.split('.')
+    if '$' in parts[-1]:
+        parts[-1] = parts[-1].split('$')[0]
+    return "/".join(parts) + ".java"
+
+
+def context_entry(class_name, method_sig, sources, tool_version):
+    source = sources.get(class_source_path(class_name))
+    return {
+        "class_name": class_name,
+        "method_sig": method_sig,
+        "source_sha256": source["sha256"] if source else None,
+        "tool_version": tool_version
+    }
+
+
+def is_stale(manifest, context_dir, context_filename, entry):
+    """
+    A context is stale when its file is missing, it has no manifest entry, or the
+    recorded source hash, signature or tool version differ. Contexts of classes
+    without a source file are always regenerated.
+    """
+    if entry["source_sha256"] is None:
+        return True
+    if not os.path.exists(os.path.join(context_dir, context_filename)):
+        return True
+    return manifest["contexts"].get(context_filename) != entry
@@ -0,0 +1,179 @@
+# SQLite-backed store for the ChatUniTest contexts of a project.
+# import_context_files() collects the context_*.json files of target/chatunitest-info
+# into target/chatunitest-info/contexts.sqlite, keyed by the exact (targetClass,
+# targetMethod) recorded inside each file, so lookups no longer depend on the mangled
+# file names of get_context_filename. ContextStore decodes a context only when it is requested.
+#
+# Usage: python context_store.py <repositories dir or chatunitest-info dir> ...
+import os
+import sys
+import json
+import sqlite3
+
+from chatunitest_context import CONTEXT_SUBDIR, simplify_signature
+from context_manifest import MANIFEST_FILE
+
+STORE_FILE = "contexts.sqlite"
+
+
+def get_store_path(context_dir):
+    return os.path.join(context_dir, STORE_FILE)
+
+
+def context_files(context_dir):
+    return [os.path.join(context_dir, name) for name in sorted(os.listdir(context_dir))
+            if name.startswith("context_") and name.endswith(".json")]
+
+
+def _create_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contexts (
+            class_name TEXT NOT NULL,
+            method_sig TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            context TEXT NOT NULL,
+            PRIMARY KEY (class_name, method_sig)
+        )
+    """)
+
+
+def _read_rows(paths):
+    """
+    Returns (class_name, method_sig, file_name, context) rows for the given context files.
+    Files that cannot be read or carry no target are skipped with a warning.
+    """
+    rows = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                context = json.load(f)
+            key = (context['targetClass'], context['targetMethod'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"  Warning: Skipping context file {path}: {e}")
+            continue
+        file_name = os.path.basename(path)
+        if key in rows:
+            print(f"  Warning: {file_name} and {rows[key][2]} both hold the context of {key[0]}.{key[1]}")
+        rows[key] = (key[0], key[1], file_name, json.dumps(context, separators=(',', ':'), ensure_ascii=False))
+    return list(rows.values())
+
+
+def _touch(store_path):
+    # Writing the store (rename, journal files) also changes the directory mtime that
+    # is_outdated() compares against, so mark the store as newer afterwards
+    os.utime(store_path)
+
+
+def import_context_files(context_dir, store_path=None):
+    """
+    Rebuilds the store from every context file in context_dir.
+    """
+    store_path = store_path or get_store_path(context_dir)
+    rows = _read_rows(context_files(context_dir))
+
+    tmp_path = store_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        _create_schema(conn)
+        conn.executemany("INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, store_path)
+    _touch(store_path)
+    return len(rows)
+
+
+def update_context_files(context_dir, paths, store_path=None):
+    """
+    Inserts or replaces the contexts of the given files in an existing store
+    (building it from scratch when there is none).
+    """
+    store_path = store_path or get_store_path(context_dir)
+    if not os.path.exists(store_path):
+        return import_context_files(context_dir, store_path)
+    rows = _read_rows(paths)
+    conn = sqlite3.connect(store_path)
+    try:
+        _create_schema(conn)
+        conn.executemany("INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    _touch(store_path)
+    return len(rows)
+
+
+class ContextStore:
+    """
+    Read-only access to a project's contexts by (class_name, method signature).
+    """
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self._conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM contexts").fetchone()[0]
+
+    def get(self, class_name, function_name):
+        """
+        Returns the decoded context, or None. The signature is simplified the same
+        way it was passed to the tool, so oracle function names can be used as is.
+        """
+        row = self._conn.execute(
+            "SELECT context FROM contexts WHERE class_name = ? AND method_sig = ?",
+            (class_name, simplify_signature(function_name))).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def is_outdated(context_dir, store_path):
+    """
+    The store is rebuilt when it is older than the context directory (files added
+    or removed) or than the manifest run_chatunitest.py writes after every run.
+    """
+    if not os.path.exists(store_path):
+        return True
+    store_mtime = os.path.getmtime(store_path)
+    for path in (context_dir, os.path.join(context_dir, MANIFEST_FILE)):
+        if os.path.exists(path) and os.path.getmtime(path) > store_mtime:
+            return True
+    return False
+
+
+def open_context_store(context_dir):
+    """
+    Opens the context store of a chatunitest-info directory, importing the context
+    files first when the store is missing or outdated. Returns None when the
+    directory does not exist.
+    """
+    if not os.path.isdir(context_dir):
+        return None
+    store_path = get_store_path(context_dir)
+    if is_outdated(context_dir, store_path):
+        print(f"  Importing context files from {context_dir} -> {store_path}...")
+        import_context_files(context_dir, store_path)
+    return ContextStore(store_path)
+
+
+def main():
+    paths = sys.argv[1:] or [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "repositories")]
+    for path in paths:
+        if os.path.isdir(os.path.join(path, CONTEXT_SUBDIR)):
+            context_dirs = [os.path.join(path, CONTEXT_SUBDIR)]
+        elif os.path.basename(os.path.normpath(path)) == os.path.basename(CONTEXT_SUBDIR):
+            context_dirs = [path]
+        else:
+            context_dirs = [os.path.join(path, d, CONTEXT_SUBDIR) for d in sorted(os.listdir(path))
+                            if os.path.isdir(os.path.join(path, d, CONTEXT_SUBDIR))]
+        for context_dir in context_dirs:
+            count = import_context_files(context_dir)
+            print(f"Imported {count} contexts from {context_dir} -> {get_store_path(context_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import os
 import json
+import argparse
+
+from project_executor import add_executor_arguments, resolve_workers, run_projects
 
 BASE_DIR = r"d:\tools\Code slice matching\repositories"
 PROJECTS = ["JHotDraw5.2", "MyWebMarket", "wikidev-filters", "junit3.8"]
@@ -57,16 +60,11 @@ def get_overlap_type(snippet, slices):
             
     return "Unknown", []
 
-def evaluate_project(project_name):
-    print(f"Evaluating {project_name}...")
-    repo_dir = os.path.join(BASE_DIR, project_name)
-    
-    snippets_path = os.path.join(repo_dir, "oracle_snippets.json")
-    slices_path = os.path.join(repo_dir, "LLM_slices.json")
-    
-    snippets = load_json(snippets_path)
-    llm_slices_data = load_json(slices_path)
-    
+def categorize_snippets(snippets, llm_slices_data):
+    """
+    Assigns every oracle snippet to an overlap category against the LLM slices.
+    Returns (category counts, per-snippet details).
+    """
     # Index LLM slices by class_name + function_name for fast lookup
     slices_map = {}
     for item in llm_slices_data:
@@ -123,6 +121,19 @@ def evaluate_project(project_name):
             "matched_slices": matched_slices
         })
 
+    return results, details
+
+def evaluate_project(project_name):
+    print(f"Evaluating {project_name}...")
+    repo_dir = os.path.join(BASE_DIR, project_name)
+    
+    snippets_path = os.path.join(repo_dir, "oracle_snippets.json")
+    slices_path = os.path.join(repo_dir, "LLM_slices.json")
+    
+    snippets = load_json(snippets_path)
+    llm_slices_data = load_json(slices_path)
+    results, details = categorize_snippets(snippets, llm_slices_data)
+
     print(f"  Results for {project_name}:")
     for k, v in results.items():
         print(f"    {k}: {v}")
@@ -213,6 +224,11 @@ def update_oracle_refined(repo_dir, details):
         print(f"  Error updating CSV: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Evaluate LLM slices against the oracle snippets.")
+    parser.add_argument("projects", nargs="*", default=PROJECTS, help="Projects to evaluate (default: all)")
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+
     all_stats = {
         "Covers Multiple": 0,
         "Inside One LLM Slice": 0,
@@ -224,9 +240,14 @@ def main():
     
     full_report = {}
     
-    for project in PROJECTS:
-        stats, details = evaluate_project(project)
-        full_report[project] = details
+    outcomes = run_projects(evaluate_project, args.projects, resolve_workers(args.workers, args.projects),
+                            log_dir=args.log_dir or os.path.join(os.path.dirname(BASE_DIR), "logs"), label="evaluate")
+    # Aggregate in project order so the report matches a serial run
+    for outcome in outcomes:
+        if not outcome["ok"]:
+            continue
+        stats, details = outcome["result"]
+        full_report[outcome["project"]] = details
         
         for k, v in stats.items():
             all_stats[k] += v
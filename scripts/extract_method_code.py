@@ -5,209 +5,39 @@
 import os
 import json
 import re
+import argparse
+import functools
 
-def get_file_path(repo_root, class_name, project_name):
-    parts = class_name.split('.')
-    if '$' in parts[-1]:
-        parts[-1] = parts[-1].split('$')[0]
-        
-    if project_name == 'JHotDraw5.2':
-        rel_path = os.path.join('sources', *parts) + '.java'
-    elif project_name == 'MyWebMarket':
-        rel_path = os.path.join('src', *parts) + '.java'
-    elif project_name == 'wikidev-filters':
-        rel_path = os.path.join('src', *parts) + '.java'
-    elif project_name == 'junit3.8':
-        rel_path = os.path.join('src', *parts) + '.java'
-    else:
-        rel_path = os.path.join('src', *parts) + '.java'
-        
-    return os.path.join(repo_root, rel_path)
-
-def simplify_type_str(t):
-    t = t.strip()
-    # Handle Vector#RAW -> Vector
-    if '#' in t:
-        t = t.split('#')[0]
-        
-    # Handle array
-    array_suffix = ""
-    while t.endswith("[]"):
-        array_suffix += "[]"
-        t = t[:-2]
-        
-    # Remove generics <...> for comparison
-    if '<' in t:
-        t = t[:t.find('<')]
-        
-    if '.' in t:
-        t = t.split('.')[-1]
-        
-    return t + array_suffix
+from project_executor import add_executor_arguments, resolve_workers, run_projects
+from java_declarations import simplify_type_str, split_params
+from source_index import SourceIndex
 
 def parse_signature(sig):
     match = re.match(r'([^(]+)\((.*)\)', sig)
     if not match:
         return sig, []
-    name = match.group(1)
-    params_str = match.group(2)
-    
-    params = []
-    depth = 0
-    current = ""
-    for char in params_str:
-        if char == '<': depth += 1
-        elif char == '>': depth -= 1
-        elif char == ',' and depth == 0:
-            params.append(current.strip())
-            current = ""
-            continue
-        current += char
-    if current.strip():
-        params.append(current.strip())
-    return name, params
-
-def match_params(source_params_str, target_types):
-    src_params = []
-    depth = 0
-    current = ""
-    for char in source_params_str:
-        if char == '<': depth += 1
-        elif char == '>': depth -= 1
-        elif char == ',' and depth == 0:
-            src_params.append(current.strip())
-            current = ""
-            continue
-        current += char
-    if current.strip():
-        src_params.append(current.strip())
-        
-    if len(src_params) != len(target_types):
-        return False
-        
-    for src, tgt in zip(src_params, target_types):
-        parts = src.split()
-        modifiers = {'final', 'synchronized'}
-        while parts and parts[0] in modifiers:
-            parts.pop(0)
-            
-        if not parts: return False
-        
-        is_c_array = False
-        if parts[-1].endswith(']'):
-             if '[' in parts[-1]:
-                 is_c_array = True
-        
-        if len(parts) > 1:
-            type_part = " ".join(parts[:-1])
-            if is_c_array:
-                type_part += "[]"
-        else:
-            type_part = parts[0]
-            
-        simple_src = simplify_type_str(type_part)
-        simple_tgt = simplify_type_str(tgt)
-        
-        if simple_src != simple_tgt:
-            return False
-            
-    return True
-
-def extract_method_body(lines, start_line_idx):
-    current_idx = start_line_idx
-    brace_count = 0
-    found_open = False
-    
-    body_lines = []
-    
-    while current_idx < len(lines):
-        line = lines[current_idx]
-        
-        clean_line = line
-        if '//' in clean_line:
-            clean_line = clean_line.split('//')[0]
-        
-        for char in clean_line:
-            if char == '{':
-                brace_count += 1
-                found_open = True
-            elif char == '}':
-                brace_count -= 1
-        
-        body_lines.append({
-            "line": current_idx + 1,
-            "code": line.rstrip('\n')
-        })
-        
-        if found_open and brace_count == 0:
-            return body_lines
-            
-        current_idx += 1
-        
-    return []
-
-def find_method_in_file(file_path, method_name, target_param_types, start_line=None):
-    if not os.path.exists(file_path):
-        return None
-        
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-        lines = f.readlines()
-        
-    def check_line(i):
-        if i < 0 or i >= len(lines): return None
-        line = lines[i]
-        if method_name not in line:
-            return None
-        # Avoid matching method *calls* like obj.methodName(...)
-        # Require that the character before the method name is whitespace or start-of-line,
-        # which is typical for declarations (e.g. "protected JMenu methodName(").
-        idx = line.find(method_name)
-        if idx > 0:
-            char_before = line[idx-1]
-            if not char_before.isspace():
-                return None
-
-        pattern = r'\b' + re.escape(method_name) + r'\s*\((.*)'
-        match = re.search(pattern, line)
-        if match:
-            params_str = match.group(1)
-            current_line_idx = i
-            
-            while ')' not in params_str and current_line_idx + 1 < len(lines):
-                current_line_idx += 1
-                params_str += " " + lines[current_line_idx].strip()
-                
-            paren_end = params_str.find(')')
-            if paren_end != -1:
-                params_content = params_str[:paren_end]
-                
-                # Check if it looks like a method call or abstract method (ends with ;)
-                after_paren = params_str[paren_end+1:].strip()
-                if after_paren.startswith(';'):
-                    return None
-                
-                if match_params(params_content, target_param_types):
-                    return extract_method_body(lines, i)
+    return match.group(1), split_params(match.group(2))
+
+def find_method(source_file, method_name, target_param_types, start_line=None):
+    """
+    Resolves a method by (name, simplified parameter types) in the file's declaration
+    table and returns its code_lines, or None.
+    """
+    key = (method_name, tuple(simplify_type_str(t) for t in target_param_types))
+    candidates = source_file.declarations.get(key)
+    if not candidates:
         return None
 
-    # Try start_line first if provided
+    declaration = candidates[0]
     if start_line is not None:
-        # Try exact line and a small window around it
-        # line_start in json is 1-based
-        idx = start_line - 1
-        
-        # Check window of +/- 5 lines
-        for offset in range(-5, 6):
-            result = check_line(idx + offset)
-            if result:
-                return result
+        # Prefer the overload declared within 5 lines of the oracle snippet start
+        near = [d for d in candidates if abs(d["line"] - start_line) <= 5]
+        if near:
+            declaration = near[0]
 
-    for i, line in enumerate(lines):
-        result = check_line(i)
-        if result:
-            return result
-                    
-    return None
+    lines = source_file.lines()
+    return [{"line": i + 1, "code": lines[i].rstrip('\n')}
+            for i in range(declaration["line"] - 1, declaration["body_end"])]
 
 def format_snippet_fallback(snippet, start_line):
     if start_line is None or start_line == -1:
@@ -260,47 +90,47 @@ def process_project(base_dir, project_name):
             
         annotated_data = []
         seen_signatures = set()
-        
-        for item in data:
-            class_name = item.get('class_name')
-            function_name = item.get('function_name')
+        # Each source file is read and indexed once, however many oracle methods it holds
+        with SourceIndex(repo_root, project_name) as source_index:
+            for item in data:
+                class_name = item.get('class_name')
+                function_name = item.get('function_name')
             
-            # Clean up function name (remove #RAW suffix if present)
-            if function_name and "#RAW" in function_name:
-                function_name = function_name.replace("#RAW", "")
-
-            # Deduplication check
-            sig_key = f"{class_name}::{function_name}"
-            if sig_key in seen_signatures:
-                continue
-            # seen_signatures.add(sig_key) # Moved to after successful extraction
-
-            start_line = item.get('line_start')
-            code_snippet = item.get('code_snippet', '')
+                # Clean up function name (remove #RAW suffix if present)
+                if function_name and "#RAW" in function_name:
+                    function_name = function_name.replace("#RAW", "")
+
+                # Deduplication check
+                sig_key = f"{class_name}::{function_name}"
+                if sig_key in seen_signatures:
+                    continue
+                # seen_signatures.add(sig_key) # Moved to after successful extraction
+
+                start_line = item.get('line_start')
+                code_snippet = item.get('code_snippet', '')
             
-            # Parse function name to get simple name and params
-            simple_name, param_types = parse_signature(function_name)
+                # Parse function name to get simple name and params
+                simple_name, param_types = parse_signature(function_name)
             
-            if '.' in simple_name:
-                simple_name = simple_name.split('.')[-1]
+                if '.' in simple_name:
+                    simple_name = simple_name.split('.')[-1]
             
-            file_path = get_file_path(repo_root, class_name, project_name)
+                # Try to extract full method body
+                source_file = source_index.get(class_name)
+                code_lines = find_method(source_file, simple_name, param_types, start_line) if source_file else None
             
-            # Try to extract full method body
-            code_lines = find_method_in_file(file_path, simple_name, param_types, start_line)
-            
-            if not code_lines:
-                print(f"  Method not found: {class_name}.{function_name}. Skipping.")
-                # Skip if not found, do not use fallback
-                continue
+                if not code_lines:
+                    print(f"  Method not found: {class_name}.{function_name}. Skipping.")
+                    # Skip if not found, do not use fallback
+                    continue
                 
-            annotated_data.append({
-                "class_name": class_name,
-                "function_name": function_name,
-                "code_lines": code_lines,
-                "cleaned_code": get_cleaned_code(code_lines)
-            })
-            seen_signatures.add(sig_key)
+                annotated_data.append({
+                    "class_name": class_name,
+                    "function_name": function_name,
+                    "code_lines": code_lines,
+                    "cleaned_code": get_cleaned_code(code_lines)
+                })
+                seen_signatures.add(sig_key)
             
         with open(output_json_path, 'w', encoding='utf-8') as f:
             json.dump(annotated_data, f, indent=4, ensure_ascii=False)
@@ -310,9 +140,18 @@ def process_project(base_dir, project_name):
     except Exception as e:
         print(f"Error processing {project_name}: {e}")
 
+BASE_DIR = r"d:\tools\Code slice matching\repositories"
+PROJECTS = ["JHotDraw5.2", "MyWebMarket", "wikidev-filters", "junit3.8"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract oracle method code from the project sources.")
+    parser.add_argument("projects", nargs="*", default=PROJECTS, help="Projects to process (default: all)")
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+
+    run_projects(functools.partial(process_project, BASE_DIR), args.projects,
+                 resolve_workers(args.workers, args.projects),
+                 log_dir=args.log_dir or os.path.join(os.path.dirname(BASE_DIR), "logs"), label="extract")
+
 if __name__ == "__main__":
-    base_dir = r"d:\tools\Code slice matching\repositories"
-    projects = ["JHotDraw5.2", "MyWebMarket", "wikidev-filters", "junit3.8"]
-    
-    for p in projects:
-        process_project(base_dir, p)
+    main()
@@ -3,30 +3,11 @@ import os
 import csv
 import json
 import re
+import argparse
+import functools
 
-def get_file_path(repo_root, class_name, project_name):
-    parts = class_name.split('.')
-    # Handle inner classes
-    if '$' in parts[-1]:
-        parts[-1] = parts[-1].split('$')[0]
-        
-    if project_name == 'JHotDraw5.2':
-        # CH.ifa.draw... -> sources/CH/ifa/draw...
-        rel_path = os.path.join('sources', *parts) + '.java'
-    elif project_name == 'MyWebMarket':
-        # classes.CustomerAction -> src/classes/CustomerAction.java
-        rel_path = os.path.join('src', *parts) + '.java'
-    elif project_name == 'wikidev-filters':
-        # ca... -> src/ca...
-        rel_path = os.path.join('src', *parts) + '.java'
-    elif project_name == 'junit3.8':
-        # junit... -> src/junit...
-        rel_path = os.path.join('src', *parts) + '.java'
-    else:
-        # Default fallback
-        rel_path = os.path.join('src', *parts) + '.java'
-        
-    return os.path.join(repo_root, rel_path)
+from project_executor import add_executor_arguments, resolve_workers, run_projects
+from source_index import SourceIndex
 
 def simplify_type(type_str):
     # Remove package prefix
@@ -170,7 +151,7 @@ def process_project(base_dir, project_name):
     snippets_data = []
     
     try:
-        with open(oracle_path, 'r', newline='') as f:
+        with SourceIndex(repo_root, project_name) as source_index, open(oracle_path, 'r', newline='') as f:
             reader = csv.DictReader(f)
             
             for row in reader:
@@ -216,21 +197,16 @@ def process_project(base_dir, project_name):
                                     formatted_signature = format_function_signature(sig_entry['raw_signature'])
                                     break
                 
-                file_path = get_file_path(repo_root, class_name, project_name)
-                
-                if not os.path.exists(file_path):
-                    print(f"  File not found: {file_path}")
-                    continue
+                file_path = source_index.file_path(class_name)
                 
                 try:
-                    with open(file_path, 'rb') as src_f:
-                        content = src_f.read()
-                    
-                    # Clamp offsets
-                    start_offset = max(0, min(start_offset, len(content)))
-                    end_offset = max(0, min(end_offset, len(content)))
+                    source_file = source_index.get(class_name)
+                    if source_file is None:
+                        print(f"  File not found: {file_path}")
+                        continue
                     
-                    code_snippet_bytes = content[start_offset:end_offset]
+                    # Offsets are clamped to the file
+                    code_snippet_bytes = source_file.read(start_offset, end_offset)
                     code_snippet = code_snippet_bytes.decode('utf-8', errors='replace')
                     
                     # If signature not found in oracle.txt, try to extract from snippet
@@ -258,9 +234,18 @@ def process_project(base_dir, project_name):
     except Exception as e:
         print(f"Error processing {project_name}: {e}")
 
+BASE_DIR = r"d:\tools\Code slice matching\repositories"
+PROJECTS = ["JHotDraw5.2", "MyWebMarket", "wikidev-filters", "junit3.8"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate oracle_snippets.json from the oracle files.")
+    parser.add_argument("projects", nargs="*", default=PROJECTS, help="Projects to process (default: all)")
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+
+    run_projects(functools.partial(process_project, BASE_DIR), args.projects,
+                 resolve_workers(args.workers, args.projects),
+                 log_dir=args.log_dir or os.path.join(os.path.dirname(BASE_DIR), "logs"), label="snippets")
+
 if __name__ == "__main__":
-    base_dir = r"d:\tools\Code slice matching\repositories"
-    projects = ["JHotDraw5.2", "MyWebMarket", "wikidev-filters", "junit3.8"]
-    
-    for p in projects:
-        process_project(base_dir, p)
+    main()
@@ -0,0 +1,234 @@
+# Method and constructor declaration tables for Java source files.
+# build_declaration_index() finds every declaration with a body in one pass over a
+# file's lines (comments and literals masked) and its BlockTree, keyed by name and
+# simplified parameter types so oracle signatures resolve by dictionary lookup.
+# Only names directly inside a class body (named or anonymous) and preceded by a
+# return type or modifier, or named after the class (constructors), are declarations;
+# calls inside method bodies and field initializers are not.
+import io
+import re
+
+from java_lexer import BlockTree, mask_literals
+
+# Bumped whenever the index built for a file changes, so persisted indexes
+# (source_index.py) are rebuilt
+DECLARATIONS_VERSION = 3
+
+# Identifiers that can be followed by "(" without starting a declaration, either as
+# the name (control flow) or as the token before it (statements)
+NON_DECLARATION_WORDS = {"if", "for", "while", "switch", "catch", "synchronized", "return", "new", "throw",
+                         "else", "case", "assert", "super", "this", "do", "try"}
+DECLARATION_NAME_RE = re.compile(r'(?<![\w$.])([A-Za-z_$][\w$]*)\s*\(')
+TYPE_HEADER_RE = re.compile(r'\b(?:class|interface|enum)\s+([A-Za-z_$][\w$]*)')
+ANONYMOUS_CLASS_RE = re.compile(r'\bnew\s+[\w$.]+\s*(?:<[^()]*>)?\s*$')
+ANNOTATION_RE = re.compile(r'@[\w$.]+(?:\s*\([^)]*\))?')
+
+
+def simplify_type_str(t):
+    t = t.strip()
+    # Handle Vector#RAW -> Vector
+    if '#' in t:
+        t = t.split('#')[0]
+        
+    # Handle array
+    array_suffix = ""
+    while t.endswith("[]"):
+        array_suffix += "[]"
+        t = t[:-2]
+        
+    # Remove generics <...> for comparison
+    if '<' in t:
+        t = t[:t.find('<')]
+        
+    if '.' in t:
+        t = t.split('.')[-1]
+        
+    return t + array_suffix
+
+
+def split_params(params_str):
+    """
+    Splits a parameter list on top-level commas (commas inside generics are kept).
+    """
+    params = []
+    depth = 0
+    current = ""
+    for char in params_str:
+        if char == '<': depth += 1
+        elif char == '>': depth -= 1
+        elif char == ',' and depth == 0:
+            params.append(current.strip())
+            current = ""
+            continue
+        current += char
+    if current.strip():
+        params.append(current.strip())
+    return params
+
+
+def source_param_type(param):
+    """
+    Simplified type of a declared parameter ("final String[] args" -> "String[]"), or None.
+    """
+    parts = param.split()
+    modifiers = {'final', 'synchronized'}
+    while parts and parts[0] in modifiers:
+        parts.pop(0)
+
+    if not parts: return None
+
+    # C-style array declarator: String args[]
+    is_c_array = parts[-1].endswith(']') and '[' in parts[-1]
+
+    if len(parts) > 1:
+        type_part = " ".join(parts[:-1])
+        if is_c_array:
+            type_part += "[]"
+    else:
+        type_part = parts[0]
+    return simplify_type_str(type_part)
+
+
+def is_declaration_start(line, match):
+    """
+    A name followed by "(" starts a declaration when it is preceded by nothing, a
+    type or a modifier (not by an operator, a call target or a statement keyword).
+    """
+    name = match.group(1)
+    if name in NON_DECLARATION_WORDS:
+        return False
+    before = line[:match.start()]
+    if before and not before[-1].isspace():
+        return False
+    before = before.strip()
+    if not before:
+        return True
+    if before[-1] in ">]":
+        return True
+    last_word = re.search(r'[\w$]+$', before)
+    return bool(last_word) and last_word.group(0) not in NON_DECLARATION_WORDS
+
+
+def statement_prefix(text, pos):
+    """
+    Text between the previous ;, { or } and pos.
+    """
+    start = max(text.rfind(";", 0, pos), text.rfind("{", 0, pos), text.rfind("}", 0, pos)) + 1
+    return text[start:pos]
+
+
+def type_body_name(text, block):
+    """
+    The class name when block is a class body ("" for an anonymous class), else None.
+    """
+    header = statement_prefix(text, block.open)
+    names = TYPE_HEADER_RE.findall(header)
+    if names:
+        return names[-1]
+    header = header.rstrip()
+    if not header.endswith(')'):
+        return None
+    # new Type(args) { ... }: find the "(" of the argument list
+    depth = 0
+    for i in range(len(header) - 1, -1, -1):
+        if header[i] == ')':
+            depth += 1
+        elif header[i] == '(':
+            depth -= 1
+            if depth == 0:
+                return "" if ANONYMOUS_CLASS_RE.search(header, 0, i) else None
+    return None
+
+
+def build_declaration_index(lines, blocks):
+    """
+    Indexes every method and constructor declaration with a body in one pass.
+    Returns {(name, (simplified param types...)): [declaration, ...]} in line order,
+    where a declaration is {"name", "param_types", "line", "body_start", "body_end"}
+    (1-based lines; body_start is the line of the opening brace).
+    lines should have comments and literals masked (see java_lexer.mask_literals);
+    blocks is the BlockTree of the file, and a body is its first block after the declaration.
+    """
+    index = {}
+    text = "".join(lines)
+    class_names = {}
+    line_start = 0
+    for i, line in enumerate(lines):
+        offset = line_start
+        line_start += len(line)
+        for match in DECLARATION_NAME_RE.finditer(line):
+            if not is_declaration_start(line, match):
+                continue
+            pos = offset + match.start()
+            # Members are declared directly inside a class body
+            owner = blocks.enclosing(pos, pos)
+            if not owner:
+                continue
+            if owner[0] not in class_names:
+                class_names[owner[0]] = type_body_name(text, owner[0])
+            class_name = class_names[owner[0]]
+            if class_name is None:
+                continue
+            # A method has a return type or modifier before its name; a constructor
+            # may have neither but is named after its class
+            prefix = ANNOTATION_RE.sub('', statement_prefix(text, pos)).strip()
+            if not prefix and match.group(1) != class_name:
+                continue
+
+            # Accumulate multi-line parameter lists
+            params_str = line[match.end():]
+            current_line_idx = i
+            while ')' not in params_str and current_line_idx + 1 < len(lines):
+                current_line_idx += 1
+                params_str += " " + lines[current_line_idx].strip()
+
+            paren_end = params_str.find(')')
+            if paren_end == -1:
+                continue
+
+            param_types = tuple(source_param_type(p) for p in split_params(params_str[:paren_end]))
+            if None in param_types:
+                continue
+            body = blocks.first_block_from(offset + match.end())
+            if body is None or body.close is None:
+                continue
+            # Abstract and interface methods end with ";" (possibly after a throws
+            # clause) before any "{", which then belongs to a later member
+            if text.find(";", offset + match.end(), body.open) != -1:
+                continue
+
+            name = match.group(1)
+            index.setdefault((name, param_types), []).append({
+                "name": name,
+                "param_types": param_types,
+                "line": i + 1,
+                "body_start": body.open_line,
+                "body_end": body.close_line
+            })
+            # The rest of a declaration line is its parameter list or body
+            break
+    return index
+
+
+def index_declarations(text):
+    """
+    Declaration index of a source text (newlines already normalized to "\n").
+    """
+    masked_lines = io.StringIO(mask_literals(text)).readlines()
+    return build_declaration_index(masked_lines, BlockTree(text))
+
+
+def declarations_to_list(index):
+    """
+    Flattens an index into a JSON-serializable list in line order.
+    """
+    return sorted((dict(d, param_types=list(d["param_types"])) for ds in index.values() for d in ds),
+                  key=lambda d: d["line"])
+
+
+def declarations_from_list(declarations):
+    index = {}
+    for d in declarations:
+        d = dict(d, param_types=tuple(d["param_types"]))
+        index.setdefault((d["name"], d["param_types"]), []).append(d)
+    return index
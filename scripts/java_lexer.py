@@ -0,0 +1,129 @@
+# Minimal Java lexer for brace structure.
+# One regex pass skips comments, string/text-block and char literals and yields the
+# real braces, from which BlockTree pairs every { with its } (offsets and 1-based lines).
+# mask_literals blanks comments and literals for searching code with plain regexes.
+# strip_comments blanks only the comments (method_dedup.py, slice_validator.py).
+# Used by extract_method_code.py (method bodies), generate_oracle.py
+# (enclosing method of a slice) and "slice graph/build_slice_graph.py" (slice brace balance).
+import bisect
+import re
+
+# Alternatives are tried in order at each position, so a "//" inside a string is
+# consumed by the string and a quote inside a comment by the comment. Unterminated
+# literals and comments end at the end of the line (literals) or of the text.
+TOKEN_RE = re.compile(
+    r'//[^\n]*'
+    r'|/\*.*?(?:\*/|\Z)'
+    r'|"""(?:\\.|[^\\])*?(?:"""|\Z)'
+    r'|"(?:\\.|[^"\\\n])*"?'
+    r"|'(?:\\.|[^'\\\n])*'?"
+    r'|[{}]',
+    re.DOTALL
+)
+
+
+def iter_braces(source):
+    """
+    Yields (offset, line, char) for every { and } outside comments and literals.
+    """
+    line = 1
+    last = 0
+    for match in TOKEN_RE.finditer(source):
+        char = match.group(0)
+        if char != "{" and char != "}":
+            continue
+        pos = match.start()
+        line += source.count("\n", last, pos)
+        last = pos
+        yield pos, line, char
+
+
+def mask_literals(source):
+    """
+    Returns source with comments and literals blanked out (newlines kept), so that
+    offsets and lines are unchanged but only code remains to be searched.
+    """
+    def blank(match):
+        text = match.group(0)
+        return text if text in "{}" else re.sub(r'[^\n]', ' ', text)
+    return TOKEN_RE.sub(blank, source)
+
+
+def strip_comments(source):
+    """
+    Returns source with only the comments blanked out (newlines kept); string and
+    char literals are left as they are, so "//" inside a literal is not a comment.
+    """
+    def blank(match):
+        text = match.group(0)
+        return re.sub(r'[^\n]', ' ', text) if text[:2] in ("//", "/*") else text
+    return TOKEN_RE.sub(blank, source)
+
+
+def brace_balance(source):
+    """
+    Number of { minus number of } outside comments and literals.
+    """
+    balance = 0
+    for _, _, char in iter_braces(source):
+        balance += 1 if char == "{" else -1
+    return balance
+
+
+class Block:
+    __slots__ = ("open", "close", "open_line", "close_line", "parent", "children")
+
+    def __init__(self, open_offset, open_line, parent):
+        self.open = open_offset
+        self.open_line = open_line
+        self.close = None
+        self.close_line = None
+        self.parent = parent
+        self.children = []
+
+
+class BlockTree:
+    """
+    Brace pairs of one source text, built in a single pass. Blocks are kept in order
+    of their opening brace; a block left open at the end of the text has close None.
+    A } without a matching { is ignored.
+    """
+    def __init__(self, source):
+        self.blocks = []
+        self.roots = []
+        stack = []
+        for pos, line, char in iter_braces(source):
+            if char == "{":
+                block = Block(pos, line, stack[-1] if stack else None)
+                (block.parent.children if block.parent else self.roots).append(block)
+                self.blocks.append(block)
+                stack.append(block)
+            elif stack:
+                block = stack.pop()
+                block.close = pos
+                block.close_line = line
+        self._opens = [block.open for block in self.blocks]
+
+    def first_block_from(self, offset):
+        """
+        The first block opening at or after offset, or None.
+        """
+        i = bisect.bisect_left(self._opens, offset)
+        return self.blocks[i] if i < len(self.blocks) else None
+
+    def enclosing(self, start_offset, end_offset):
+        """
+        Closed blocks that strictly enclose [start_offset, end_offset], innermost first.
+        """
+        i = bisect.bisect_left(self._opens, start_offset)
+        # The innermost enclosing block is the last one opening before start_offset
+        # that still contains it; its ancestors are the others.
+        block = self.blocks[i - 1] if i > 0 else None
+        while block is not None and not (block.close is not None and block.close > end_offset):
+            block = block.parent
+        result = []
+        while block is not None:
+            if block.close is not None and block.close > end_offset:
+                result.append(block)
+            block = block.parent
+        return result
@@ -0,0 +1,80 @@
+# Line index of a source file: the offsets at which its lines start, built once per
+# file and kept in an array, so that offset -> line and line -> offset are bisect /
+# index lookups instead of counting newlines for every query.
+# Files of MMAP_THRESHOLD bytes or more are scanned through a read-only mmap instead
+# of being read into memory. Shared through source_index.SourceFile by
+# add_line_numbers.py, generate_snippets_json.py and generate_oracle.py.
+import mmap
+import bisect
+from array import array
+
+MMAP_THRESHOLD = 1 << 20
+
+
+def map_file(path):
+    """
+    Read-only mmap of a whole file (which must not be empty).
+    """
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def newline_offsets(content):
+    """
+    array of the offsets at which each line of content starts (bytes, mmap or str).
+    """
+    newline = '\n' if isinstance(content, str) else b'\n'
+    starts = array('q', [0])
+    pos = content.find(newline)
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = content.find(newline, pos + 1)
+    return starts
+
+
+class LineIndex:
+    """
+    Line starts of a text of `size` bytes (or characters). Lines are 1-based;
+    out-of-range offsets and lines are clamped like the scripts always did.
+    """
+    def __init__(self, starts, size):
+        self.starts = starts
+        self.size = size
+
+    @classmethod
+    def from_content(cls, content):
+        return cls(newline_offsets(content), len(content))
+
+    @classmethod
+    def from_bytes(cls, raw, size):
+        starts = array('q')
+        starts.frombytes(raw)
+        return cls(starts, size)
+
+    def to_bytes(self):
+        return self.starts.tobytes()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line_number(self, offset):
+        """
+        1-based line holding offset.
+        """
+        offset = max(0, min(offset, self.size))
+        return bisect.bisect_right(self.starts, offset)
+
+    def line_offset(self, line):
+        """
+        Offset at which the 1-based line starts.
+        """
+        line = max(1, min(line, len(self.starts)))
+        return self.starts[line - 1]
+
+    def line_span(self, line):
+        """
+        (start, end) offsets of the 1-based line, end including its newline.
+        """
+        line = max(1, min(line, len(self.starts)))
+        end = self.starts[line] if line < len(self.starts) else self.size
+        return self.starts[line - 1], end
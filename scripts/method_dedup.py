@@ -0,0 +1,130 @@
+# Deduplication of identical focal methods before they are sent to the LLM.
+# Oracle entries with the same body (overloads with identical code, classes copied
+# between source trees) and the same CCG shape share one request; the slices of the
+# representative are fanned out to every duplicate with line numbers rebased.
+import json
+import hashlib
+
+from java_lexer import strip_comments
+
+
+def significant_lines(method_data):
+    """
+    Returns [(line_number, normalized_code)] for the lines that carry code.
+    Comments are removed with java_lexer.strip_comments, which keeps string literals
+    intact (a "//" in a URL is not a comment) and keeps the newlines of block comments
+    so line numbers stay aligned.
+    """
+    code_lines = method_data.get('code_lines') or []
+    if not code_lines:
+        return []
+    source = "\n".join(entry['code'] for entry in code_lines)
+    source = strip_comments(source)
+
+    lines = []
+    for entry, text in zip(code_lines, source.split("\n")):
+        text = " ".join(text.split())
+        if text:
+            lines.append((entry['line'], text))
+    return lines
+
+
+def ccg_shape(ccg_data, method_data, lines=None):
+    """
+    The CCG with node ids and absolute positions removed: node types and edges
+    expressed as indexes into significant_lines, so it is equal for duplicates.
+    """
+    if not ccg_data:
+        return None
+    lines = lines if lines is not None else significant_lines(method_data)
+    code_lines = method_data.get('code_lines') or []
+    method_start = code_lines[0]['line'] if code_lines else 1
+    position = {line: i for i, (line, _) in enumerate(lines)}
+
+    def index_of(node):
+        # CCG line_num is relative to the method, 1 = declaration line
+        return position.get(method_start + node['line_num'] - 1, -1)
+
+    nodes = {node['id']: node for node in ccg_data.get('nodes', [])}
+    shape_nodes = sorted((index_of(n), n.get('node_type', '')) for n in nodes.values())
+    shape_edges = sorted(
+        (edge['type'], index_of(nodes[edge['from']]), index_of(nodes[edge['to']]))
+        for edge in ccg_data.get('edges', [])
+        if edge['from'] in nodes and edge['to'] in nodes
+    )
+    return [shape_nodes, shape_edges]
+
+
+def dedup_key(method_data, ccg_data):
+    """
+    Hash of the normalized body plus the CCG shape, or None when the method has no code.
+    """
+    lines = significant_lines(method_data)
+    if not lines:
+        return None
+    payload = {
+        "code": [text for _, text in lines],
+        "ccg": ccg_shape(ccg_data, method_data, lines)
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def group_duplicates(jobs):
+    """
+    Groups job indexes by dedup key, in order of first appearance.
+    Jobs without code form groups of their own.
+    """
+    groups = {}
+    for i, job in enumerate(jobs):
+        key = dedup_key(job["method"], job.get("ccg_data"))
+        groups.setdefault(key if key is not None else ("single", i), []).append(i)
+    return list(groups.values())
+
+
+def make_line_mapper(source_method, target_method):
+    """
+    Returns a function mapping a source line number to the matching target line.
+    Significant lines map one-to-one; other lines keep their distance to the
+    closest preceding significant line.
+    """
+    source = [line for line, _ in significant_lines(source_method)]
+    target = [line for line, _ in significant_lines(target_method)]
+    pairs = list(zip(source, target))
+
+    def rebase(line):
+        if not pairs:
+            return line
+        offset = pairs[0][1] - pairs[0][0]
+        for src, dst in pairs:
+            if src > line:
+                break
+            offset = dst - src
+        return line + offset
+    return rebase
+
+
+def rebase_slices(slices, source_method, target_method):
+    rebase = make_line_mapper(source_method, target_method)
+    rebased = []
+    for item in slices:
+        item = dict(item)
+        for field in ("start_line", "end_line"):
+            try:
+                item[field] = rebase(int(item[field]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        rebased.append(item)
+    return rebased
+
+
+def fan_out(result, source_method, target_method):
+    """
+    Copies a slicing result of source_method for its duplicate target_method.
+    """
+    return {
+        "full_response": result["full_response"],
+        "analysis": result["analysis"],
+        "slices": rebase_slices(result["slices"], source_method, target_method),
+        "deduplicated_from": f"{source_method['class_name']}::{source_method['function_name']}"
+    }
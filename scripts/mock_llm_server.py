@@ -0,0 +1,366 @@
+# Local OpenAI-compatible stand-in server for offline throughput benchmarking.
+# Serves POST /v1/chat/completions with responses synthesized from the
+# oracle_methods.json line ranges of every project, and can simulate latency,
+# 429 rate limiting and injected errors. Streaming ("stream": true) is served as
+# server-sent events. Provider-side prompt caching is simulated: prompt prefixes
+# seen before are reported as cached_tokens and shorten the time to first token.
+# GET /stats returns request counters.
+#
+# Usage:
+#   python mock_llm_server.py --port 8000 --latency-dist lognormal --latency-mean 2 --rpm 60 --error-rate 0.05
+#   OPENAI_BASE_URL=http://127.0.0.1:8000/v1 python batch_slice_methods.py JHotDraw5.2
+import os
+import re
+import json
+import time
+import hashlib
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mock_responses import synthesize_completion
+from slice_engine import estimate_tokens
+
+REPOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "repositories")
+
+# Characters per streamed delta (roughly a few tokens, like real providers)
+STREAM_CHUNK_CHARS = 16
+
+# Prompt caching as providers document it: prompts of at least 1024 tokens, cached
+# in 128-token increments of shared prefix (tokens approximated as 4 characters)
+PREFIX_CACHE_MIN_CHARS = 1024 * 4
+PREFIX_CACHE_BLOCK_CHARS = 128 * 4
+# Fraction of the time to first token saved for a fully cached prompt
+PREFIX_CACHE_LATENCY_SAVING = 0.5
+
+# Focal method identity as rendered by the "json" and "compact" prompt formats
+JSON_CLASS_RE = re.compile(r'"class_name":\s*"((?:[^"\\]|\\.)*)"')
+JSON_FUNCTION_RE = re.compile(r'"function_name":\s*"((?:[^"\\]|\\.)*)"')
+COMPACT_RE = re.compile(r'^class: (.+)\nmethod: (.+)$', re.MULTILINE)
+
+
+def load_oracle_methods(repos_dir):
+    """
+    Maps (class_name, function_name) -> oracle method for every project.
+    """
+    methods = {}
+    for project in sorted(os.listdir(repos_dir)):
+        path = os.path.join(repos_dir, project, "oracle_methods.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for method in json.load(f):
+                methods[(method['class_name'], method['function_name'])] = method
+    return methods
+
+
+def find_focal_method(prompt, methods):
+    match = COMPACT_RE.search(prompt)
+    if match:
+        return methods.get((match.group(1).strip(), match.group(2).strip()))
+    class_match = JSON_CLASS_RE.search(prompt)
+    function_match = JSON_FUNCTION_RE.search(prompt)
+    if class_match and function_match:
+        class_name = json.loads(f'"{class_match.group(1)}"')
+        function_name = json.loads(f'"{function_match.group(1)}"')
+        return methods.get((class_name, function_name))
+    return None
+
+
+class LatencyModel:
+    """
+    Draws simulated response latencies (seconds) from a configurable distribution.
+    """
+    def __init__(self, dist="fixed", mean=0.5, jitter=0.0, per_token=0.0, rng=None):
+        self.dist = dist
+        self.mean = mean
+        self.jitter = jitter
+        self.per_token = per_token
+        self.rng = rng or random.Random()
+
+    def sample(self, completion_tokens=0):
+        if self.dist == "uniform":
+            base = self.rng.uniform(max(0.0, self.mean - self.jitter), self.mean + self.jitter)
+        elif self.dist == "exponential":
+            base = self.rng.expovariate(1.0 / self.mean) if self.mean > 0 else 0.0
+        elif self.dist == "lognormal":
+            # jitter is the sigma of the underlying normal; mean stays the median
+            base = self.rng.lognormvariate(0.0, self.jitter or 0.5) * self.mean
+        else:
+            base = self.mean
+        return max(0.0, base + self.per_token * completion_tokens)
+
+
+class MockState:
+    """
+    Shared server state: oracle methods, simulation settings, rate limit window and counters.
+    """
+    def __init__(self, methods, latency, rpm=None, tpm=None, error_rate=0.0, malformed_rate=0.0,
+                 max_context_tokens=None, seed=None, prompt_cache=True):
+        self.methods = methods
+        self.latency = latency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.max_context_tokens = max_context_tokens
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = []  # (timestamp, tokens) of requests accepted in the last minute
+        self.prompt_cache = prompt_cache
+        self.prefix_hashes = set()
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0, "malformed": 0,
+                      "context_overflow": 0, "unknown_method": 0, "aborted_streams": 0, "prompt_tokens": 0,
+                      "completion_tokens": 0, "cached_tokens": 0, "started_at": time.time()}
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def admit(self, tokens):
+        """
+        Sliding one-minute window. Returns 0 when admitted, otherwise the
+        number of seconds until capacity frees up.
+        """
+        with self.lock:
+            now = time.time()
+            self.window = [(t, n) for t, n in self.window if now - t < 60.0]
+            over_rpm = self.rpm and len(self.window) >= self.rpm
+            over_tpm = self.tpm and sum(n for _, n in self.window) + tokens > self.tpm
+            if over_rpm or over_tpm:
+                return max(0.1, 60.0 - (now - self.window[0][0])) if self.window else 1.0
+            self.window.append((now, tokens))
+            return 0
+
+    def cached_prefix_tokens(self, prompt):
+        """
+        Returns the tokens of the longest block-aligned prefix of prompt seen in an
+        earlier request, and remembers the prefixes of this one.
+        """
+        if not self.prompt_cache or len(prompt) < PREFIX_CACHE_MIN_CHARS:
+            return 0
+        data = prompt.encode('utf-8')
+        digest = hashlib.sha256(data[:PREFIX_CACHE_MIN_CHARS])
+        prefixes = []
+        end = PREFIX_CACHE_MIN_CHARS
+        while True:
+            prefixes.append((end, digest.hexdigest()))
+            if end + PREFIX_CACHE_BLOCK_CHARS > len(data):
+                break
+            digest.update(data[end:end + PREFIX_CACHE_BLOCK_CHARS])
+            end += PREFIX_CACHE_BLOCK_CHARS
+        with self.lock:
+            cached = max((n for n, h in prefixes if h in self.prefix_hashes), default=0)
+            self.prefix_hashes.update(h for _, h in prefixes)
+        return cached // 4
+
+    def roll(self, rate):
+        with self.lock:
+            return self.rng.random() < rate
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/1.0"
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load; /stats has the numbers
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, error_type, code=None, headers=None):
+        self._send_json(status, {"error": {"message": message, "type": error_type, "param": None, "code": code}},
+                        headers)
+
+    def _send_stream(self, content, model, usage, include_usage):
+        """
+        Sends the completion as chat.completion.chunk events, pacing each delta by
+        the per-token latency. Returns False if the client hung up early.
+        """
+        state = self.server.state
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {"id": f"chatcmpl-mock-{state.stats['requests']}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+
+        def event(payload):
+            self.wfile.write(b"data: " + json.dumps(payload).encode('utf-8') + b"\n\n")
+            self.wfile.flush()
+
+        try:
+            event(dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                       "finish_reason": None}]))
+            for i in range(0, len(content), STREAM_CHUNK_CHARS):
+                piece = content[i:i + STREAM_CHUNK_CHARS]
+                time.sleep(state.latency.per_token * estimate_tokens(piece))
+                event(dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+            event(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+            if include_usage:
+                event(dict(base, choices=[], usage=usage))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            state.count("aborted_streams")
+            return False
+        return True
+
+    def do_GET(self):
+        state = self.server.state
+        if self.path.rstrip('/').endswith("/stats"):
+            with state.lock:
+                stats = dict(state.stats)
+            elapsed = max(1e-9, time.time() - stats["started_at"])
+            stats["requests_per_second"] = round(stats["requests"] / elapsed, 3)
+            self._send_json(200, stats)
+        elif self.path.rstrip('/').endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "Request body is not valid JSON", "invalid_request_error")
+            return
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+            return
+
+        state.count("requests")
+        messages = request.get("messages", [])
+        prompt = "\n".join(m.get("content") or "" for m in messages)
+        prompt_tokens = estimate_tokens(prompt)
+        max_tokens = request.get("max_completion_tokens") or request.get("max_tokens") or 4096
+
+        if state.max_context_tokens and prompt_tokens + max_tokens > state.max_context_tokens:
+            state.count("context_overflow")
+            self._send_error(400, f"This model's maximum context length is {state.max_context_tokens} tokens.",
+                             "invalid_request_error", "context_length_exceeded")
+            return
+
+        retry_after = state.admit(prompt_tokens + max_tokens)
+        if retry_after:
+            state.count("rate_limited")
+            self._send_error(429, "Rate limit reached (mock).", "requests", "rate_limit_exceeded", {
+                "Retry-After": f"{retry_after:.2f}",
+                "x-ratelimit-limit-requests": str(state.rpm or 0),
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": f"{retry_after:.2f}s"
+            })
+            return
+
+        if state.roll(state.error_rate):
+            state.count("errors")
+            time.sleep(state.latency.sample() / 2)
+            self._send_error(500, "The server had an error while processing your request (mock).", "server_error")
+            return
+
+        method = find_focal_method(prompt, state.methods)
+        if method is None:
+            state.count("unknown_method")
+            content = "### Analysis\n\nFocal method not found in any oracle_methods.json.\n\n```json\n[]\n```"
+        else:
+            content = synthesize_completion(method)
+        if state.roll(state.malformed_rate):
+            state.count("malformed")
+            # Drop the tail of the JSON block, as a truncated completion would
+            content = content[:content.rfind("```json") + len("```json") + 40]
+
+        completion_tokens = estimate_tokens(content)
+        cached_tokens = min(prompt_tokens, state.cached_prefix_tokens(prompt))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+        state.count("ok")
+        state.count("prompt_tokens", prompt_tokens)
+        state.count("cached_tokens", cached_tokens)
+        # A cached prefix does not have to be processed again, which shortens the time to first token
+        first_token_factor = 1.0 - PREFIX_CACHE_LATENCY_SAVING * cached_tokens / max(1, prompt_tokens)
+
+        if request.get("stream"):
+            # Time to first token is the base latency; the per-token part paces the deltas
+            time.sleep(state.latency.sample(0) * first_token_factor)
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            if self._send_stream(content, request.get("model", "mock"), usage, include_usage):
+                state.count("completion_tokens", completion_tokens)
+            return
+
+        time.sleep(state.latency.sample(0) * first_token_factor + state.latency.per_token * completion_tokens)
+        state.count("completion_tokens", completion_tokens)
+
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{state.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+
+def make_server(host, port, state):
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server for slicing benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--repos-dir", default=REPOS_DIR, help="Directory with <project>/oracle_methods.json")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "exponential", "lognormal"], default="fixed")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="Mean (median for lognormal) latency in seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="Half-width for uniform, sigma for lognormal")
+    parser.add_argument("--latency-per-token", type=float, default=0.0, help="Extra seconds per completion token")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests/min before answering 429")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens/min before answering 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of responses with truncated JSON")
+    parser.add_argument("--max-context-tokens", type=int, default=None,
+                        help="Reject prompts above this size with context_length_exceeded")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-prompt-cache", action="store_true", help="Always report cached_tokens as 0")
+    args = parser.parse_args()
+
+    methods = load_oracle_methods(args.repos_dir)
+    latency = LatencyModel(args.latency_dist, args.latency_mean, args.latency_jitter, args.latency_per_token,
+                           random.Random(args.seed))
+    state = MockState(methods, latency, args.rpm, args.tpm, args.error_rate, args.malformed_rate,
+                      args.max_context_tokens, args.seed, not args.no_prompt_cache)
+    server = make_server(args.host, args.port, state)
+    print(f"Mock LLM server with {len(methods)} oracle methods on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(state.stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Synthesizes slicing responses from oracle_methods.json line ranges, in the
+# format prompt.txt asks for (markdown analysis followed by a ```json slice list).
+# Used by the local stand-ins so the pipeline can run without an API key.
+import json
+
+from java_lexer import iter_braces
+
+
+def synthesize_slices(method_data):
+    """
+    Splits the method body into slices at blank lines between top-level statements,
+    so every slice has balanced braces. The declaration and the closing brace of the
+    body are left out of the slices, as prompt.txt allows; a method without body
+    lines (e.g. written on one line) becomes a single slice.
+    """
+    code_lines = method_data.get('code_lines') or []
+    if not code_lines:
+        return []
+
+    # Brace depth at the end of each line
+    deltas = [0] * len(code_lines)
+    for _, line, char in iter_braces("\n".join(entry['code'] for entry in code_lines)):
+        deltas[line - 1] += 1 if char == "{" else -1
+    depths = []
+    depth = 0
+    for delta in deltas:
+        depth += delta
+        depths.append(depth)
+
+    opened = [i for i, d in enumerate(depths) if d > 0]
+    body_start = opened[0] + 1 if opened else len(code_lines)
+    body_end = next((i for i in range(body_start, len(code_lines)) if depths[i] <= 0), len(code_lines))
+
+    groups = []
+    current = []
+    for i in range(body_start, body_end):
+        entry = code_lines[i]
+        if entry['code'].strip():
+            current.append(entry)
+        elif current and depths[i - 1] == depths[body_start - 1]:
+            # A blank line back at body level ends a group of statements
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    if not groups:
+        groups = [code_lines]
+
+    code_by_line = {entry['line']: entry['code'] for entry in code_lines}
+    slices = []
+    for i, group in enumerate(groups):
+        start_line, end_line = group[0]['line'], group[-1]['line']
+        slices.append({
+            "id": i + 1,
+            "description": f"Step {i + 1} of {method_data.get('function_name', 'the method')}",
+            "code": "\n".join(code_by_line.get(line, "") for line in range(start_line, end_line + 1)),
+            "start_line": start_line,
+            "end_line": end_line
+        })
+    return slices
+
+
+def synthesize_completion(method_data):
+    """
+    Returns the full completion text for one focal method.
+    """
+    name = f"{method_data.get('class_name')}::{method_data.get('function_name')}"
+    analysis = (
+        f"### Step 1: Summary\n\n`{name}` (synthesized response).\n\n"
+        f"### Step 2: Environment\n\n- Invoked parameters and fields: n/a\n- Invoked methods: n/a\n\n"
+        f"### Step 3: Decomposition\n"
+    )
+    slices_json = json.dumps(synthesize_slices(method_data), indent=2)
+    return f"{analysis}\n```json\n{slices_json}\n```"
@@ -0,0 +1,100 @@
+# Shared project-level executor for the per-project scripts.
+# Runs func(project) for every project in a process pool, writes each project's
+# console output to its own log file, and prints an aggregated summary.
+# With workers=1 projects run in-process, in order, printing to the console as before.
+import os
+import sys
+import time
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def default_workers(projects):
+    return max(1, min(len(projects), os.cpu_count() or 1))
+
+
+def _run_logged(func, project, log_path):
+    """
+    Worker entry point: runs one project with stdout/stderr captured in log_path.
+    """
+    started = time.time()
+    with open(log_path, 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            result = func(project)
+            ok, error = True, None
+        except Exception as e:
+            traceback.print_exc()
+            result, ok, error = None, False, f"{type(e).__name__}: {e}"
+    return {"project": project, "ok": ok, "error": error, "result": result,
+            "elapsed": time.time() - started, "log": log_path}
+
+
+def _run_inline(func, project):
+    started = time.time()
+    try:
+        result = func(project)
+        ok, error = True, None
+    except Exception as e:
+        traceback.print_exc()
+        result, ok, error = None, False, f"{type(e).__name__}: {e}"
+    return {"project": project, "ok": ok, "error": error, "result": result,
+            "elapsed": time.time() - started, "log": None}
+
+
+def run_projects(func, projects, workers=1, log_dir=None, label="run"):
+    """
+    Runs func(project) for each project and returns one outcome dict per project,
+    in the order of `projects`: {project, ok, error, result, elapsed, log}.
+    func must be a picklable top-level callable (or functools.partial of one)
+    when workers > 1.
+    """
+    started = time.time()
+    if workers <= 1 or len(projects) <= 1:
+        outcomes = [_run_inline(func, project) for project in projects]
+    else:
+        log_dir = log_dir or os.path.join(os.getcwd(), "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        print(f"Running {len(projects)} projects with {workers} workers (logs in {log_dir})...")
+        by_project = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_logged, func, project, os.path.join(log_dir, f"{label}_{project}.log")): project
+                       for project in projects}
+            for future in as_completed(futures):
+                project = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    # The worker process itself died (e.g. killed or out of memory)
+                    outcome = {"project": project, "ok": False, "error": f"{type(e).__name__}: {e}",
+                               "result": None, "elapsed": 0.0, "log": None}
+                by_project[project] = outcome
+                status = "done" if outcome["ok"] else f"FAILED ({outcome['error']})"
+                print(f"  [{project}] {status} in {outcome['elapsed']:.1f}s")
+        outcomes = [by_project[project] for project in projects]
+
+    print_summary(outcomes, time.time() - started, label)
+    return outcomes
+
+
+def print_summary(outcomes, wall_time, label="run"):
+    ok_count = sum(1 for o in outcomes if o["ok"])
+    serial_time = sum(o["elapsed"] for o in outcomes)
+    print(f"\n=== {label} summary: {ok_count}/{len(outcomes)} projects succeeded ===")
+    for o in outcomes:
+        status = "ok" if o["ok"] else f"FAILED: {o['error']}"
+        log = f"  log: {o['log']}" if o["log"] else ""
+        print(f"  {o['project']:<20} {o['elapsed']:8.1f}s  {status}{log}")
+    print(f"  Wall time {wall_time:.1f}s (sum of project times {serial_time:.1f}s)")
+    sys.stdout.flush()
+
+
+def add_executor_arguments(parser):
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of projects processed in parallel (0 = one per CPU core)")
+    parser.add_argument("--log-dir", default=None, help="Directory for per-project logs when workers > 1")
+
+
+def resolve_workers(workers, projects):
+    return default_workers(projects) if workers == 0 else workers
@@ -0,0 +1,106 @@
+# Token-budget-aware prompt building.
+# Counts prompt tokens locally before a request is sent and, when the prompt would
+# not leave room for the completion, degrades the inputs in a fixed order:
+#   1. trim dependencies (drop dependent method bodies)
+#   2. drop CF edges from the CCG
+#   3. drop DD edges that span more than DD_MAX_HOPS statements
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+from slice_engine import estimate_tokens
+
+# gpt-4o context window
+CONTEXT_WINDOW = 128000
+# Headroom for chat formatting overhead and tokenizer differences
+SAFETY_MARGIN = 512
+# DD edges between statements further apart than this are dropped at level 3
+DD_MAX_HOPS = 3
+
+DEGRADATION_LEVELS = ["none", "trim_dependencies", "drop_cf_edges", "prune_dd_edges"]
+
+_encoding = None
+_encoding_unavailable = tiktoken is None
+
+
+def get_encoding():
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # No cached BPE file and no network: use the estimate instead
+            print(f"  Warning: tiktoken encoding unavailable ({e}); using estimated token counts")
+            _encoding_unavailable = True
+    return _encoding
+
+
+def count_tokens(text):
+    """
+    Counts tokens with the gpt-4o tokenizer when tiktoken is installed,
+    otherwise estimates them (~4 characters per token).
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def trim_dependencies(dependencies):
+    """
+    Keeps the dependent field declarations and method signatures, drops method bodies.
+    """
+    if not isinstance(dependencies, dict):
+        return dependencies
+    return {k: v for k, v in dependencies.items() if k != "dependentMethodBodies"}
+
+
+def drop_edges(ccg_data, edge_type):
+    if not ccg_data:
+        return ccg_data
+    return dict(ccg_data, edges=[e for e in ccg_data.get('edges', []) if e['type'] != edge_type])
+
+
+def prune_dd_edges(ccg_data, max_hops=DD_MAX_HOPS):
+    """
+    Drops DD edges whose endpoints are more than max_hops statements apart
+    (CCG node ids follow statement order).
+    """
+    if not ccg_data:
+        return ccg_data
+    edges = [e for e in ccg_data.get('edges', [])
+             if e['type'] != "DD" or abs(e['to'] - e['from']) <= max_hops]
+    return dict(ccg_data, edges=edges)
+
+
+def degrade_inputs(dependencies, ccg_data, level, dd_max_hops=DD_MAX_HOPS):
+    """
+    Returns (dependencies, ccg_data) reduced to the given degradation level.
+    Levels are cumulative.
+    """
+    if level >= 1:
+        dependencies = trim_dependencies(dependencies)
+    if level >= 2:
+        ccg_data = drop_edges(ccg_data, "CF")
+    if level >= 3:
+        ccg_data = prune_dd_edges(ccg_data, dd_max_hops)
+    return dependencies, ccg_data
+
+
+def build_budgeted_prompt(render, method_data, dependencies, ccg_data, system_prompt,
+                          max_completion_tokens, context_window=CONTEXT_WINDOW, dd_max_hops=DD_MAX_HOPS):
+    """
+    render(method_data, dependencies, ccg_data) -> prompt text.
+    Returns (prompt, degradation) where degradation records the level used and the
+    prompt token count. If even the last level is over budget, its prompt is returned
+    with "over_budget": True.
+    """
+    budget = context_window - max_completion_tokens - SAFETY_MARGIN
+    for level, name in enumerate(DEGRADATION_LEVELS):
+        deps, ccg = degrade_inputs(dependencies, ccg_data, level, dd_max_hops)
+        prompt = render(method_data, deps, ccg)
+        tokens = count_tokens(system_prompt) + count_tokens(prompt)
+        if tokens <= budget:
+            return prompt, {"level": level, "name": name, "prompt_tokens": tokens}
+    return prompt, {"level": level, "name": name, "prompt_tokens": tokens, "over_budget": True}
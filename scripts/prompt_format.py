@@ -0,0 +1,81 @@
+# Compact, token-efficient serialization of the prompt inputs.
+# The default prompt embeds json.dumps(..., indent=2) of the focal method, the
+# dependencies and the CCG. The compact form prints every code line once, refers
+# to CCG nodes by line number instead of repeating their statements, and groups
+# edges into adjacency lists per edge type. compact_template() relabels the
+# prompt.txt sections that would otherwise describe the payload as JSON.
+import json
+from collections import defaultdict
+
+EDGE_TYPES = ["CF", "CD", "DD"]
+
+# prompt.txt text describing the default payloads -> wording for the compact payloads
+COMPACT_TEMPLATE_TEXT = [
+    ("```json\n{{ focal method }}", "```\n{{ focal method }}"),
+    ("This graph contains nodes (statements) and edges representing",
+     "This graph lists its nodes as id:line (the statements are the focal method lines with those "
+     "numbers, '?' marks predicates) and its edges as one adjacency list per type "
+     "(\"DD: 0>1,2\" means edges 0->1 and 0->2). The edge types represent"),
+]
+
+
+def compact_template(prompt_template):
+    """
+    The prompt template with the section texts adjusted to the compact payloads.
+    Dependencies stay JSON (minified), so their fence is kept.
+    """
+    for old, new in COMPACT_TEMPLATE_TEXT:
+        prompt_template = prompt_template.replace(old, new)
+    return prompt_template
+
+
+def compact_focal_method(method_data):
+    """
+    class/function header followed by "<line>: <code>" for every line.
+    cleaned_code is dropped because it repeats the numbered lines.
+    """
+    lines = [f"class: {method_data['class_name']}", f"method: {method_data['function_name']}"]
+    for entry in method_data.get('code_lines', []):
+        lines.append(f"{entry['line']}: {entry['code'].rstrip()}")
+    return "\n".join(lines)
+
+
+def compact_dependencies(dependencies):
+    return json.dumps(dependencies, separators=(',', ':'), ensure_ascii=False)
+
+
+def compact_ccg(ccg_data, method_data=None):
+    """
+    Nodes as "id:line" (absolute source lines, '?' marks predicates), then one
+    adjacency list per edge type: "CF: 0>1,2 1>3".
+    Statement text is only included when the focal method lines are not available.
+    """
+    code_lines = (method_data or {}).get('code_lines') or []
+    method_start = code_lines[0]['line'] if code_lines else None
+
+    node_parts = []
+    for node in ccg_data.get('nodes', []):
+        marker = "?" if node.get('node_type') == "predicate" else ""
+        if method_start is not None:
+            # CCG line_num is relative to the method, 1 = declaration line
+            node_parts.append(f"{node['id']}:{method_start + node['line_num'] - 1}{marker}")
+        else:
+            node_parts.append(f"{node['id']}:{node['line_num']}{marker} {node['statement']}")
+
+    adjacency = defaultdict(lambda: defaultdict(list))
+    for edge in ccg_data.get('edges', []):
+        adjacency[edge['type']][edge['from']].append(edge['to'])
+
+    lines = [f"method: {ccg_data.get('method_name', '')}"]
+    if method_start is not None:
+        lines.append("nodes (id:line, ?=predicate): " + " ".join(node_parts))
+    else:
+        lines.append("nodes (id:relative_line statement):")
+        lines.extend(node_parts)
+    for edge_type in EDGE_TYPES + sorted(set(adjacency) - set(EDGE_TYPES)):
+        targets = adjacency.get(edge_type)
+        if not targets:
+            continue
+        groups = [f"{src}>{','.join(str(t) for t in dsts)}" for src, dsts in targets.items()]
+        lines.append(f"{edge_type}: " + " ".join(groups))
+    return "\n".join(lines)
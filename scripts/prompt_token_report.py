@@ -0,0 +1,73 @@
+# This script compares the input size of the "json" and "compact" prompt formats
+# for every oracle method and reports the token savings per method and per project.
+import os
+import json
+
+import batch_slice_methods as bsm
+from prompt_budget import count_tokens
+
+PROJECTS = ["JHotDraw5.2", "MyWebMarket", "wikidev-filters", "junit3.8"]
+
+
+def count_prompt_tokens(prompt):
+    return count_tokens(bsm.SYSTEM_PROMPT) + count_tokens(prompt)
+
+
+def report_project(project_name, prompt_template):
+    print(f"Processing {project_name}...")
+    jobs = bsm.load_project_jobs(project_name)
+    if not jobs:
+        return []
+
+    rows = []
+    for job in jobs:
+        method = job["method"]
+        json_tokens = count_prompt_tokens(
+            bsm.render_prompt(method, job["dependencies"], job["ccg_data"], prompt_template, "json"))
+        compact_tokens = count_prompt_tokens(
+            bsm.render_prompt(method, job["dependencies"], job["ccg_data"], prompt_template, "compact"))
+        saved = json_tokens - compact_tokens
+        rows.append({
+            "class_name": method['class_name'],
+            "function_name": method['function_name'],
+            "json_tokens": json_tokens,
+            "compact_tokens": compact_tokens,
+            "saved_tokens": saved,
+            "saved_percent": round(100.0 * saved / json_tokens, 1) if json_tokens else 0.0
+        })
+        print(f"  {method['class_name']}::{method['function_name']}: "
+              f"{json_tokens} -> {compact_tokens} ({rows[-1]['saved_percent']}% saved)")
+    return rows
+
+
+def main():
+    prompt_template = bsm.load_prompt_template()
+    report = {}
+
+    summary_lines = []
+    for project in PROJECTS:
+        rows = report_project(project, prompt_template)
+        json_total = sum(r["json_tokens"] for r in rows)
+        compact_total = sum(r["compact_tokens"] for r in rows)
+        saved_percent = round(100.0 * (json_total - compact_total) / json_total, 1) if json_total else 0.0
+        report[project] = {
+            "methods": rows,
+            "json_tokens": json_total,
+            "compact_tokens": compact_total,
+            "saved_percent": saved_percent
+        }
+        summary_lines.append(f"{project:<18}{len(rows):>8}{json_total:>10}{compact_total:>10}{saved_percent:>7}%")
+
+    print("\n=== Token Savings ===")
+    print(f"{'Project':<18}{'Methods':>8}{'JSON':>10}{'Compact':>10}{'Saved':>8}")
+    for line in summary_lines:
+        print(line)
+
+    report_path = os.path.join(bsm.BASE_DIR, "prompt_token_report.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nDetailed report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
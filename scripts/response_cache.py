@@ -0,0 +1,111 @@
+# On-disk, content-addressed cache of LLM slicing responses.
+# The key is a hash of the fully rendered request (messages + model parameters),
+# so any change to the focal method, dependencies, CCG, prompt template or model
+# settings produces a new entry automatically.
+import os
+import json
+import hashlib
+
+
+def make_cache_key(messages, model, temperature, max_completion_tokens):
+    """
+    Returns a stable SHA-256 key for one chat completion request.
+    """
+    payload = {
+        "messages": messages,
+        "model": model,
+        "temperature": temperature,
+        "max_completion_tokens": max_completion_tokens
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResponseCache:
+    """
+    Stores one JSON file per key under cache_dir/<key[:2]>/<key>.json.
+    When the total size exceeds max_bytes, the least recently used entries
+    (by modification time, refreshed on every hit) are evicted.
+    Safe to share between processes: writes are atomic and entries removed by
+    another process are treated as misses.
+    """
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(os.path.getsize(p) for p in self._entry_paths())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # Treat a corrupt entry as a miss; it will be overwritten
+            self.misses += 1
+            return None
+        # Mark as recently used for eviction
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return {
+            "full_response": entry["full_response"],
+            "analysis": entry["analysis"],
+            "slices": entry["slices"]
+        }
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "key": key,
+            "full_response": result["full_response"],
+            "analysis": result["analysis"],
+            "slices": result["slices"]
+        }
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        # Write atomically so an interrupted run never leaves a half-written entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.total_bytes += os.path.getsize(path) - old_size
+        self._evict()
+
+    def _evict(self):
+        if not self.max_bytes or self.total_bytes <= self.max_bytes:
+            return
+        # Other processes may have added or evicted entries, so rescan before evicting
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
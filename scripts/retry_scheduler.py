@@ -0,0 +1,263 @@
+# Retry scheduling for the LLM calls made by batch_slice_methods.py.
+# Classifies failures (rate limit, transient, parse, non-retryable), honours the
+# provider's Retry-After / x-ratelimit-reset-* headers, applies jittered exponential
+# backoff, pauses every concurrent worker when the provider throttles, and trips a
+# circuit breaker after sustained provider failures.
+import re
+import time
+import random
+import asyncio
+import email.utils
+
+# Network failures of the OpenAI client (APITimeoutError is an APIConnectionError) and
+# of the HTTP transport under it; the scheduler itself does not need either package
+try:
+    from openai import APIConnectionError
+except ImportError:
+    APIConnectionError = None
+try:
+    from httpx import TransportError
+except ImportError:
+    TransportError = None
+NETWORK_ERRORS = tuple(t for t in (APIConnectionError, TransportError) if t is not None) + (
+    ConnectionError, TimeoutError, asyncio.TimeoutError)
+
+# HTTP statuses worth retrying; other 4xx responses will fail the same way again
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_KINDS = {"rate_limit", "transient", "parse"}
+# Failures that say something about the provider rather than the prompt
+PROVIDER_KINDS = {"rate_limit", "transient"}
+
+
+class SliceError(Exception):
+    """
+    A failed slicing attempt. kind is one of:
+      rate_limit    - the provider throttled the request (429)
+      transient     - timeouts, connection errors, 5xx, empty responses
+      parse         - the completion could not be parsed into slices
+      fatal         - not retryable (context overflow, auth, invalid request, bugs)
+      circuit_open  - not sent because the circuit breaker is open
+      cache_miss    - replay-only run without a cached response
+    response is the parsed completion ({"full_response", "analysis", ...}) when the
+    provider answered but the answer was rejected, so failure records can keep it.
+    """
+    def __init__(self, kind, message, retry_after=None, response=None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+        self.response = response
+
+    @property
+    def retryable(self):
+        return self.kind in RETRYABLE_KINDS
+
+
+def parse_duration(value):
+    """
+    Parses the duration formats used by rate-limit headers: "1.5", "20ms", "1s", "6m0s".
+    Returns seconds, or None if the value is not understood.
+    """
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(n) * scale[u] for n, u in parts)
+
+
+def parse_retry_after(headers):
+    """
+    Returns how long the provider asked us to wait, in seconds, or None.
+    retry-after-ms and Retry-After take precedence over the x-ratelimit-reset-* hints.
+    """
+    if not headers:
+        return None
+    headers = {str(k).lower(): v for k, v in headers.items()}
+
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        seconds = parse_duration(value)
+        if seconds is not None:
+            return seconds
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    resets = [parse_duration(headers[name]) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+              if name in headers]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def classify_exception(exc):
+    """
+    Maps an exception raised by the OpenAI client (or by our own parsing) to a SliceError.
+    Exceptions that are neither HTTP errors nor network errors are bugs rather than
+    provider trouble, so they are fatal: not retried and not counted by the breaker.
+    """
+    if isinstance(exc, SliceError):
+        return exc
+    status = getattr(exc, "status_code", None)
+    code = getattr(exc, "code", None)
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    message = str(exc)
+
+    if code == "context_length_exceeded" or "maximum context length" in message:
+        return SliceError("fatal", f"context overflow: {message}")
+    if status == 429:
+        # Quota exhaustion is reported as a 429 but does not clear by waiting
+        if code == "insufficient_quota":
+            return SliceError("fatal", f"insufficient quota: {message}")
+        return SliceError("rate_limit", message, parse_retry_after(headers))
+    if status is None:
+        if isinstance(exc, NETWORK_ERRORS):
+            return SliceError("transient", f"{type(exc).__name__}: {message}")
+        return SliceError("fatal", f"unexpected {type(exc).__name__}: {message}")
+    if status in RETRYABLE_STATUS or status >= 500:
+        return SliceError("transient", f"HTTP {status}: {message}", parse_retry_after(headers))
+    return SliceError("fatal", f"HTTP {status}: {message}")
+
+
+class RetryScheduler:
+    """
+    Shared by every concurrent call of one run (a single event loop).
+
+    - A rate-limited response pauses all calls until the provider's reset time.
+    - Retries wait base_delay * backoff_factor**attempt (capped at max_delay),
+      jittered to between half and all of it, and never less than Retry-After.
+    - After breaker_threshold consecutive provider failures the breaker opens and
+      calls fail fast for breaker_cooldown seconds. Then it is half-open: a single
+      probe call is sent while the others wait; its success (or any answer from the
+      provider) closes the breaker, a provider failure opens it again.
+    """
+    def __init__(self, max_retries=3, base_delay=1.0, backoff_factor=2.0, max_delay=60.0,
+                 breaker_threshold=10, breaker_cooldown=60.0, rng=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.rng = rng or random.Random()
+        self.paused_until = 0.0
+        self.consecutive_failures = 0
+        self.open_until = None
+        self.half_open = False
+        self.probe = None
+        self.retries = 0
+        self.pauses = 0
+        self.trips = 0
+        self.failures = {}
+
+    def backoff_delay(self, attempt, error=None):
+        cap = min(self.max_delay, self.base_delay * self.backoff_factor ** attempt)
+        delay = self.rng.uniform(cap / 2, cap)
+        if error is not None and error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    def pause(self, seconds):
+        """
+        Holds back every call of this run for `seconds` (extends an existing pause).
+        """
+        until = time.monotonic() + seconds
+        if until > self.paused_until:
+            self.paused_until = until
+            self.pauses += 1
+            print(f"    Provider throttled; pausing all requests for {seconds:.1f}s")
+
+    async def wait_until_ready(self):
+        """
+        Waits out throttling pauses and a running half-open probe.
+        Returns True when this call is the probe.
+        """
+        is_probe = False
+        while True:
+            if not is_probe:
+                if self.probe is not None:
+                    await self.probe.wait()
+                    continue
+                if self.open_until is not None:
+                    if time.monotonic() < self.open_until:
+                        raise SliceError("circuit_open", "circuit breaker open after repeated provider failures")
+                    self.open_until = None
+                    self.half_open = True
+                    self.probe = asyncio.Event()
+                    is_probe = True
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                return is_probe
+            await asyncio.sleep(delay)
+
+    def end_probe(self):
+        if self.half_open:
+            # The probe ended without an answer (cancelled); let the next call probe again
+            self.half_open = False
+            self.open_until = time.monotonic()
+        self.probe.set()
+        self.probe = None
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.half_open = False
+
+    def record_failure(self, error):
+        self.failures[error.kind] = self.failures.get(error.kind, 0) + 1
+        if error.kind == "rate_limit":
+            self.pause(error.retry_after if error.retry_after is not None else self.backoff_delay(0))
+        if error.kind not in PROVIDER_KINDS:
+            # The provider answered, so a half-open breaker closes
+            self.half_open = False
+            return
+        self.consecutive_failures += 1
+        if self.half_open or (self.breaker_threshold and self.consecutive_failures >= self.breaker_threshold):
+            if self.open_until is None:
+                self.trips += 1
+                print(f"    Circuit breaker open for {self.breaker_cooldown:.0f}s "
+                      f"after {self.consecutive_failures} consecutive provider failures")
+            self.open_until = time.monotonic() + self.breaker_cooldown
+            self.half_open = False
+
+    async def run(self, call, label):
+        """
+        Awaits call() until it succeeds, retrying retryable failures.
+        Returns the result; raises SliceError when giving up.
+        """
+        attempt = 0
+        while True:
+            is_probe = await self.wait_until_ready()
+            try:
+                result = await call()
+            except Exception as exc:
+                error = classify_exception(exc)
+                self.record_failure(error)
+            else:
+                self.record_success()
+                return result
+            finally:
+                if is_probe:
+                    self.end_probe()
+            if not error.retryable or attempt >= self.max_retries or self.open_until is not None:
+                raise error
+            delay = self.backoff_delay(attempt, error)
+            attempt += 1
+            self.retries += 1
+            print(f"    Retry {attempt}/{self.max_retries} for {label} in {delay:.1f}s ({error.kind}: {error})")
+            await asyncio.sleep(delay)
+
+    def summary(self):
+        parts = [f"{self.retries} retries", f"{self.pauses} throttling pauses", f"{self.trips} breaker trips"]
+        if self.failures:
+            parts.append("failures: " + ", ".join(f"{k}={v}" for k, v in sorted(self.failures.items())))
+        return "; ".join(parts)
@@ -1,10 +1,33 @@
 # This script runs the ChatUniTest context extractor tool for all methods defined in oracle_methods.json for each project.
+#
+# The tool is run once per method: methods are run one at a time until one call has
+# parsed the project, then the remaining --no-parse calls only read the parsed project
+# and run in parallel with a per-method timeout. chatunitest-core's command line takes
+# a single -c/-m target and has no stdin or server mode, so there is no way to extract
+# several methods per JVM without changing the tool itself. Failed extractions and their stderr
+# are written to target/chatunitest-info/failures.json.
+#
+# target/chatunitest-info/manifest.json (see context_manifest.py) records what each
+# context was generated from, so re-runs only regenerate stale or missing contexts and
+# skip parsing when no source file changed. The contexts written by a run are added to
+# the project's context store (see context_store.py).
+#
+# Usage:
+#   python run_chatunitest.py                       # every project
+#   python run_chatunitest.py junit3.8 --jobs 4     # 4 --no-parse extractions at a time
+#   python run_chatunitest.py junit3.8 --force      # regenerate every context
 import os
 import json
+import time
+import argparse
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import re
+from chatunitest_context import get_context_dir, get_context_filename, simplify_signature
+from context_manifest import (context_entry, get_tool_version, hash_sources, is_stale, load_manifest,
+                              project_fingerprint, save_manifest)
+from context_store import update_context_files
 
 # Configuration
 JAR_PATH = r"d:\tools\chatunitest-core\chatunitest-core-2.1.2-SNAPSHOT.jar"
@@ -17,104 +40,278 @@ PROJECT_CONFIG = {
     "junit3.8": {"src": "src"}
 }
 
-def simplify_signature(sig):
+# Parallel --no-parse extractions per project. Each one is a separate JVM, so this is
+# bounded by memory rather than by CPU count.
+DEFAULT_JOBS = min(8, os.cpu_count() or 1)
+# Seconds before an extraction is killed; the parsing call loads the whole project
+METHOD_TIMEOUT = 300
+PARSE_TIMEOUT = 1800
+
+# Written next to the context files when extractions fail
+FAILURE_REPORT = "failures.json"
+
+def build_classpath_args(project_root, config):
+    """
+    Builds the -cp arguments if libs are configured for the project.
+    """
+    if "libs" not in config:
+        return []
+    libs_dir = os.path.join(project_root, config["libs"])
+    if not os.path.exists(libs_dir):
+        return []
+    # Find all .jar files in the libs directory
+    jars = [os.path.join(libs_dir, f) for f in os.listdir(libs_dir) if f.endswith(".jar")]
+    if not jars:
+        return []
+    print(f"  Using classpath with {len(jars)} jars from {config['libs']}")
+    # Join with os.pathsep (semicolon on Windows)
+    return ["-cp", os.pathsep.join(jars)]
+
+
+def build_command(project_root, config, classpath_args, extra_args):
+    # java -jar chatunitest-core-2.1.2-SNAPSHOT.jar -p <project_root> -s <src_dir> [-cp <classpath>] <extra_args>
+    cmd = [
+        "java", "-jar", JAR_PATH,
+        "-p", project_root,
+        "-s", config['src']
+    ]
+    cmd.extend(classpath_args)
+    cmd.extend(extra_args)
+    return cmd
+
+
+def missing_contexts(project_root, methods, since):
+    """
+    Returns the methods whose context file was not written at or after `since`.
+    """
+    context_dir = get_context_dir(project_root)
+    missing = []
+    for method in methods:
+        path = os.path.join(context_dir, get_context_filename(method['class_name'], method['function_name']))
+        try:
+            if os.path.getmtime(path) >= since:
+                continue
+        except OSError:
+            pass
+        missing.append(method)
+    return missing
+
+
+def run_method(project_root, config, classpath_args, method, no_parse, timeout):
+    """
+    Runs the tool for one method. Returns None on success, else a failure record.
+    """
+    method_sig = simplify_signature(method['function_name'])
+    extra_args = ["-c", method['class_name'], "-m", method_sig]
+    if no_parse:
+        extra_args.append("--no-parse")
+    cmd = build_command(project_root, config, classpath_args, extra_args)
+
+    failure = {
+        "class_name": method['class_name'],
+        "function_name": method['function_name'],
+        "method_sig": method_sig,
+        "no_parse": no_parse,
+        "returncode": None,
+        "timed_out": False,
+        "stderr": "",
+        "command": cmd
+    }
+    started = time.time()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        stderr = e.stderr.decode('utf-8', 'replace') if isinstance(e.stderr, bytes) else (e.stderr or "")
+        failure.update(timed_out=True, stderr=stderr.strip())
+    except Exception as e:
+        failure["stderr"] = f"{type(e).__name__}: {e}"
+    else:
+        if result.returncode == 0:
+            return None
+        failure.update(returncode=result.returncode, stderr=result.stderr.strip())
+    failure["elapsed"] = round(time.time() - started, 2)
+    return failure
+
+
+def describe_failure(failure):
+    if failure["timed_out"]:
+        return f"timed out after {failure['elapsed']}s"
+    if failure["returncode"] is not None:
+        return f"exit code {failure['returncode']}"
+    return failure["stderr"]
+
+
+def run_per_method(project_root, config, classpath_args, methods, parsed_successfully=False,
+                   jobs=1, timeout=None):
+    """
+    Runs the tool once per method. Until one call succeeds the methods are run
+    one at a time with parsing; the remaining --no-parse calls only read the
+    parsed project and run on `jobs` parallel workers.
+    Returns (success_count, failures).
+    """
+    success_count = 0
+    failures = []
+    done = 0
+
+    def report(method, failure, mode_str):
+        nonlocal success_count, done
+        done += 1
+        label = f"{method['class_name']}.{simplify_signature(method['function_name'])}"
+        if failure is None:
+            success_count += 1
+            print(f"[{done}/{len(methods)}] Done ({mode_str}) {label}")
+        else:
+            failures.append(failure)
+            print(f"[{done}/{len(methods)}] Failed ({mode_str}) {label}: {describe_failure(failure)}")
+
+    pending = list(methods)
+    while pending and not parsed_successfully:
+        method = pending.pop(0)
+        failure = run_method(project_root, config, classpath_args, method, False, PARSE_TIMEOUT)
+        parsed_successfully = failure is None
+        report(method, failure, "parsing")
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(run_method, project_root, config, classpath_args, method, True, timeout): method
+                   for method in pending}
+        for future in as_completed(futures):
+            report(futures[future], future.result(), "cached")
+
+    return success_count, failures
+
+
+def failure_kind(failure):
+    if failure["timed_out"]:
+        return "timeout"
+    return "exit_code" if failure["returncode"] is not None else "exception"
+
+
+def write_failure_report(project_root, project_name, failures):
     """
-    Removes generic type parameters from the method signature.
-    Example: clustering(ArrayList<IArtifact>) -> clustering(ArrayList)
+    Writes the failed extractions with their stderr next to the context files.
+    A run without failures removes the report of a previous run.
     """
-    # Remove content within angle brackets <...>
-    # Using a loop to handle nested brackets if necessary, but simple regex works for most
-    # We use a non-greedy match
-    sig = re.sub(r'<[^>]+>', '', sig)
-    # Remove #RAW suffix if present (found in JHotDraw5.2)
-    sig = sig.replace("#RAW", "")
-    return sig
-
-def run_tool():
+    report_path = os.path.join(get_context_dir(project_root), FAILURE_REPORT)
+    if not failures:
+        if os.path.exists(report_path):
+            os.remove(report_path)
+        return
+
+    by_kind = {}
+    for failure in failures:
+        by_kind[failure_kind(failure)] = by_kind.get(failure_kind(failure), 0) + 1
+    report = {
+        "project": project_name,
+        "failed": len(failures),
+        "by_kind": by_kind,
+        "failures": sorted(failures, key=lambda f: (f["class_name"], f["function_name"]))
+    }
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"  Failure report ({', '.join(f'{n} {k}' for k, n in by_kind.items())}) saved to {report_path}")
+
+
+def process_project(project_name, config, jobs=DEFAULT_JOBS, timeout=METHOD_TIMEOUT, force=False):
+    project_root = os.path.join(BASE_DIR, project_name)
+    json_path = os.path.join(project_root, "oracle_methods.json")
+
+    if not os.path.exists(json_path):
+        print(f"Skipping {project_name}: {json_path} not found")
+        return
+
+    print(f"Loading methods from {json_path}...")
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            methods = json.load(f)
+    except Exception as e:
+        print(f"Error loading JSON for {project_name}: {e}")
+        return
+
+    print(f"Processing {project_name} ({len(methods)} methods)...")
+
+    # Only contexts whose class source, signature or tool version changed are regenerated
+    context_dir = get_context_dir(project_root)
+    manifest = load_manifest(context_dir)
+    tool_version = get_tool_version(JAR_PATH)
+    sources = hash_sources(os.path.join(project_root, config['src']), manifest["sources"])
+    fingerprint = project_fingerprint(sources, tool_version)
+    if force:
+        manifest["contexts"] = {}
+        manifest["project_fingerprint"] = None
+
+    entries = {}
+    stale = []
+    for method in methods:
+        context_filename = get_context_filename(method['class_name'], method['function_name'])
+        entries[context_filename] = context_entry(method['class_name'], simplify_signature(method['function_name']),
+                                                  sources, tool_version)
+        if is_stale(manifest, context_dir, context_filename, entries[context_filename]):
+            stale.append(method)
+
+    manifest["sources"] = sources
+    if not stale:
+        save_manifest(context_dir, manifest)
+        update_context_files(context_dir, [])
+        print(f"Finished {project_name}: all {len(methods)} contexts up to date.")
+        return
+    # The tool's parsed project is still valid when no source file changed since it was parsed
+    parsed = manifest["project_fingerprint"] == fingerprint
+    print(f"  {len(stale)} of {len(methods)} contexts stale or missing"
+          f"{'; project unchanged, skipping the parse' if parsed else ''}")
+
+    classpath_args = build_classpath_args(project_root, config)
+    # File mtimes can be coarser than time.time(); allow for a rounded-down timestamp
+    started = time.time() - 2
+
+    success_count, failures = run_per_method(project_root, config, classpath_args, stale,
+                                             parsed_successfully=parsed, jobs=jobs, timeout=timeout)
+
+    # Record the contexts written by this run; failed ones stay stale for the next run
+    failed = {(f["class_name"], f["function_name"]) for f in failures}
+    missing = missing_contexts(project_root, stale, started)
+    written = []
+    for method in stale:
+        if method in missing or (method['class_name'], method['function_name']) in failed:
+            continue
+        context_filename = get_context_filename(method['class_name'], method['function_name'])
+        manifest["contexts"][context_filename] = entries[context_filename]
+        written.append(os.path.join(context_dir, context_filename))
+    if success_count:
+        manifest["project_fingerprint"] = fingerprint
+    save_manifest(context_dir, manifest)
+    # Saved after the manifest so the store is not considered outdated
+    update_context_files(context_dir, written)
+
+    write_failure_report(project_root, project_name, failures)
+    print(f"Finished {project_name}: {success_count} success, {len(failures)} failed, "
+          f"{len(methods) - len(stale)} up to date.")
+
+
+def run_tool(projects=None, jobs=DEFAULT_JOBS, timeout=METHOD_TIMEOUT, force=False):
     # Check if JAR exists (using os.path.exists might fail if restricted, but subprocess will definitely fail if not found)
     if not os.path.exists(JAR_PATH):
         print(f"Warning: JAR file not found at {JAR_PATH}")
         # We proceed anyway, maybe it's accessible to the system even if not to python's os.stat
-    
-    for project_name, config in PROJECT_CONFIG.items():
-        project_root = os.path.join(BASE_DIR, project_name)
-        json_path = os.path.join(project_root, "oracle_methods.json")
-        
-        if not os.path.exists(json_path):
-            print(f"Skipping {project_name}: {json_path} not found")
-            continue
-            
-        print(f"Loading methods from {json_path}...")
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                methods = json.load(f)
-        except Exception as e:
-            print(f"Error loading JSON for {project_name}: {e}")
+
+    for project_name in projects or PROJECT_CONFIG:
+        if project_name not in PROJECT_CONFIG:
+            print(f"Skipping {project_name}: no entry in PROJECT_CONFIG")
             continue
-            
-        print(f"Processing {project_name} ({len(methods)} methods)...")
-        
-        # Build classpath if libs are configured
-        classpath_args = []
-        if "libs" in config:
-            libs_dir = os.path.join(project_root, config["libs"])
-            if os.path.exists(libs_dir):
-                # Find all .jar files in the libs directory
-                jars = [os.path.join(libs_dir, f) for f in os.listdir(libs_dir) if f.endswith(".jar")]
-                if jars:
-                    # Join with os.pathsep (semicolon on Windows)
-                    cp_string = os.pathsep.join(jars)
-                    classpath_args = ["-cp", cp_string]
-                    print(f"  Using classpath with {len(jars)} jars from {config['libs']}")
-        
-        success_count = 0
-        fail_count = 0
-        parsed_successfully = False
-        
-        for i, method in enumerate(methods):
-            class_name = method['class_name']
-            original_sig = method['function_name']
-            
-            # Simplify signature for the tool (remove generics)
-            method_sig = simplify_signature(original_sig)
-            
-            # Construct command
-            # java -jar chatunitest-core-2.1.2-SNAPSHOT.jar -p <project_root> -c <class_name> -m <method_sig> -s <src_dir> [-cp <classpath>]
-            cmd = [
-                "java", "-jar", JAR_PATH,
-                "-p", project_root,
-                "-c", class_name,
-                "-m", method_sig,
-                "-s", config['src']
-            ]
-            
-            if classpath_args:
-                cmd.extend(classpath_args)
-            
-            mode_str = "parsing"
-            if parsed_successfully:
-                cmd.append("--no-parse")
-                mode_str = "cached"
-            
-            print(f"[{i+1}/{len(methods)}] Running ({mode_str}) for {class_name}.{method_sig}...")
-            
-            try:
-                # Run command
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    success_count += 1
-                    parsed_successfully = True
-                else:
-                    fail_count += 1
-                    print(f"  Failed: {class_name}.{method_sig}")
-                    print(f"  Error: {result.stderr.strip()}")
-                    
-            except Exception as e:
-                fail_count += 1
-                print(f"  Exception: {e}")
-        
-        print(f"Finished {project_name}: {success_count} success, {fail_count} failed.")
+        process_project(project_name, PROJECT_CONFIG[project_name], jobs, timeout, force)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract ChatUniTest contexts for the oracle methods.")
+    parser.add_argument("projects", nargs="*", help="Projects to process (default: all in PROJECT_CONFIG)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Parallel --no-parse extractions once the project is parsed")
+    parser.add_argument("--timeout", type=float, default=METHOD_TIMEOUT,
+                        help="Seconds before a --no-parse extraction is killed")
+    parser.add_argument("--force", action="store_true", help="Regenerate every context, ignoring the manifest")
+    args = parser.parse_args()
+    run_tool(args.projects, args.jobs, args.timeout, args.force)
+
 
 if __name__ == "__main__":
-    run_tool()
+    main()
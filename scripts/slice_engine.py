@@ -0,0 +1,81 @@
+# Async execution engine used by batch_slice_methods.py.
+# Runs many LLM calls concurrently while respecting the provider's request and token limits.
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` units and refills continuously
+    at `refill_per_second`. acquire() waits until enough units are available.
+    """
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.available = float(capacity)
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.available = min(self.capacity, self.available + elapsed * self.refill_per_second)
+
+    async def acquire(self, amount=1):
+        # A single request larger than the bucket could never be served; clamp it
+        # so it waits for a full bucket instead of blocking forever.
+        amount = min(float(amount), self.capacity)
+        # The lock keeps waiters in FIFO order so large requests are not starved
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                missing = amount - self.available
+                await asyncio.sleep(missing / self.refill_per_second)
+
+
+class RateLimiter:
+    """
+    Combines a requests/min and a tokens/min bucket.
+    A limit of None (or 0) disables the corresponding bucket.
+    """
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.request_bucket = None
+        self.token_bucket = None
+        if requests_per_minute:
+            self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        if tokens_per_minute:
+            self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    async def acquire(self, tokens):
+        if self.request_bucket:
+            await self.request_bucket.acquire(1)
+        if self.token_bucket:
+            await self.token_bucket.acquire(tokens)
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token) used for rate limiting.
+    """
+    return len(text) // 4 + 1
+
+
+async def run_ordered(items, worker, concurrency):
+    """
+    Runs `await worker(index, item)` for every item with at most `concurrency`
+    calls in flight. Results are returned in the order of `items`, regardless
+    of completion order, so the output stays deterministic.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = [None] * len(items)
+
+    async def run_one(index, item):
+        async with semaphore:
+            results[index] = await worker(index, item)
+
+    await asyncio.gather(*(run_one(i, item) for i, item in enumerate(items)))
+    return results
@@ -0,0 +1,193 @@
+# Local validation of LLM slices against the focal method's code_lines, and the
+# small follow-up ("repair") prompt used when validation fails.
+# Checks rule C (syntactic integrity: balanced braces) and rule E (exhaustive
+# coverage) of prompt.txt, plus malformed ranges and partially overlapping slices.
+# Nested slices are allowed: rule B lets a control-flow header be sliced apart from its body.
+import re
+import json
+
+from java_lexer import iter_braces
+from method_dedup import significant_lines
+from prompt_format import compact_focal_method
+
+BRACE_ONLY_RE = re.compile(r'^[{}\s]+$')
+JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*\n(.*?)```', re.DOTALL)
+
+
+def slice_range(item):
+    """
+    Returns (start_line, end_line) as ints, or None when the slice has no usable range.
+    """
+    try:
+        start, end = int(item["start_line"]), int(item["end_line"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (start, end) if start <= end else None
+
+
+def braces_balanced(texts):
+    """
+    Returns True when the braces in the given lines are balanced, ignoring braces
+    inside string and char literals and comments.
+    """
+    depth = 0
+    for _, _, char in iter_braces("\n".join(texts)):
+        depth += 1 if char == "{" else -1
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+def required_lines(method_data):
+    """
+    Lines that must be covered by some slice: every line carrying code, except the
+    declaration (up to the opening brace of the body) and lines holding only braces.
+    """
+    lines = significant_lines(method_data)
+    required = []
+    in_declaration = True
+    for line, text in lines:
+        if in_declaration:
+            if "{" in text:
+                in_declaration = False
+            continue
+        if not BRACE_ONLY_RE.match(text):
+            required.append(line)
+    return required
+
+
+def to_ranges(lines, all_lines):
+    """
+    Collapses lines into [start, end] ranges that are contiguous within all_lines.
+    """
+    position = {line: i for i, line in enumerate(all_lines)}
+    ranges = []
+    for line in lines:
+        if ranges and position[line] == position[ranges[-1][1]] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ranges
+
+
+def validate_slices(slices, method_data):
+    """
+    Returns a report: {"valid", "uncovered": [[start, end]], "overlaps": [[id, id]],
+    "unbalanced": [id], "invalid": [id]}.
+    """
+    code_lines = method_data.get('code_lines') or []
+    code_by_line = {entry['line']: entry['code'] for entry in code_lines}
+    first_line = code_lines[0]['line'] if code_lines else None
+    last_line = code_lines[-1]['line'] if code_lines else None
+
+    report = {"valid": True, "uncovered": [], "overlaps": [], "unbalanced": [], "invalid": []}
+    ranges = []
+    for item in slices:
+        slice_id = item.get("id")
+        bounds = slice_range(item)
+        if bounds is None or first_line is None or bounds[0] < first_line or bounds[1] > last_line:
+            report["invalid"].append(slice_id)
+            continue
+        ranges.append((slice_id, bounds))
+        texts = [code_by_line.get(line, "") for line in range(bounds[0], bounds[1] + 1)]
+        if not braces_balanced(texts):
+            report["unbalanced"].append(slice_id)
+
+    for i, (id_a, (start_a, end_a)) in enumerate(ranges):
+        for id_b, (start_b, end_b) in ranges[i + 1:]:
+            intersects = start_a <= end_b and start_b <= end_a
+            nested = (start_a <= start_b and end_b <= end_a) or (start_b <= start_a and end_a <= end_b)
+            if intersects and (not nested or (start_a, end_a) == (start_b, end_b)):
+                report["overlaps"].append([id_a, id_b])
+
+    required = required_lines(method_data)
+    uncovered = [line for line in required
+                 if not any(start <= line <= end for _, (start, end) in ranges)]
+    report["uncovered"] = to_ranges(uncovered, required)
+
+    report["valid"] = not (report["uncovered"] or report["overlaps"] or report["unbalanced"] or report["invalid"])
+    return report
+
+
+def problem_count(report):
+    return len(report["uncovered"]) + len(report["overlaps"]) + len(report["unbalanced"]) + len(report["invalid"])
+
+
+def broken_slice_ids(report):
+    ids = set(report["unbalanced"]) | set(report["invalid"])
+    for pair in report["overlaps"]:
+        ids.update(pair)
+    return sorted(ids, key=str)
+
+
+def build_repair_prompt(method_data, slices, report):
+    """
+    Follow-up prompt that asks only for replacements of the broken slices and for
+    slices covering the uncovered lines. It carries the numbered method and the
+    current slice ranges, but no dependencies, CCG or full instructions.
+    """
+    lines = [
+        "A method was decomposed into slices, but some slices break the slicing rules.",
+        "",
+        "Focal method (with line numbers):",
+        compact_focal_method(method_data),
+        "",
+        "Current slices (id: start-end description):"
+    ]
+    for item in slices:
+        lines.append(f"{item.get('id')}: {item.get('start_line')}-{item.get('end_line')} {item.get('description', '')}")
+
+    lines.append("")
+    lines.append("Problems:")
+    for start, end in report["uncovered"]:
+        lines.append(f"- Lines {start}-{end} are not covered by any slice.")
+    for id_a, id_b in report["overlaps"]:
+        lines.append(f"- Slices {id_a} and {id_b} partially overlap.")
+    for slice_id in report["unbalanced"]:
+        lines.append(f"- Slice {slice_id} has unbalanced braces.")
+    for slice_id in report["invalid"]:
+        lines.append(f"- Slice {slice_id} has missing or out-of-range line numbers.")
+
+    broken = broken_slice_ids(report)
+    tasks = []
+    if broken:
+        tasks.append(f"replace slices {', '.join(str(i) for i in broken)}")
+    if report["uncovered"]:
+        tasks.append("add slices that cover the uncovered lines")
+    lines.append("")
+    lines.append(" and ".join(tasks).capitalize() + ".")
+    lines.append("Do not repeat the other slices. Every slice must keep its braces balanced and must not "
+                 "partially overlap any other slice.")
+    lines.append("Output only a JSON array of slices with the fields id, description, code, start_line and end_line.")
+    return "\n".join(lines)
+
+
+def parse_repair_response(content):
+    """
+    Returns the slice list of a repair response, or None if it is not a JSON array of objects.
+    """
+    match = JSON_BLOCK_RE.search(content or "")
+    text = match.group(1) if match else (content or "")
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        slices = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(slices, list) or not all(isinstance(item, dict) for item in slices):
+        return None
+    return slices
+
+
+def merge_repair(slices, replacements, report):
+    """
+    Drops the broken slices, adds the replacements, and renumbers by position.
+    """
+    broken = set(broken_slice_ids(report))
+    kept = [dict(item) for item in slices if item.get("id") not in broken]
+    merged = kept + [dict(item) for item in replacements]
+    merged.sort(key=lambda item: (slice_range(item) or (float("inf"), 0))[0])
+    for i, item in enumerate(merged):
+        item["id"] = i + 1
+    return merged
@@ -0,0 +1,254 @@
+# Shared per-project index of the Java sources used by the oracle preparation scripts
+# (add_line_numbers.py, generate_snippets_json.py, extract_method_code.py, generate_oracle.py).
+# Resolves class names (including Outer$Inner) to source files and caches, per file,
+# its bytes, its line index (line_index.py) and its declaration table. Entries are
+# persisted in <project>/source_index.sqlite and reused while the file's size and mtime
+# are unchanged, so the preparation chain reads each .java file once. Files of
+# MMAP_THRESHOLD bytes or more are memory-mapped and only their index is persisted.
+#
+# Usage: python source_index.py <repositories dir> [project ...]   # (re)build the indexes
+import io
+import os
+import sys
+import json
+import sqlite3
+
+from java_declarations import DECLARATIONS_VERSION, declarations_from_list, declarations_to_list, index_declarations
+from line_index import MMAP_THRESHOLD, LineIndex, map_file
+
+# Source root of each project, relative to repositories/<project>
+SOURCE_ROOTS = {
+    "JHotDraw5.2": "sources",
+    "MyWebMarket": "src",
+    "wikidev-filters": "src",
+    "junit3.8": "src"
+}
+DEFAULT_SOURCE_ROOT = "src"
+
+INDEX_FILE = "source_index.sqlite"
+# Bumped when the layout of the files table changes; older indexes are rebuilt
+INDEX_VERSION = 2
+
+
+def get_source_root(project_name):
+    return SOURCE_ROOTS.get(project_name, DEFAULT_SOURCE_ROOT)
+
+
+def class_to_rel_path(class_name):
+    """
+    CH.ifa.draw.standard.PasteCommand -> CH/ifa/draw/standard/PasteCommand.java
+    Inner classes (Outer$Inner) live in their outer class's file.
+    """
+    parts = class_name.split('.')
+    if '$' in parts[-1]:
+        parts[-1] = parts[-1].split('$')[0]
+    return "/".join(parts) + ".java"
+
+
+class SourceFile:
+    """
+    One indexed source file. Text views decode the bytes the way the scripts used to
+    open the files in text mode (universal newlines), and are built on first use.
+    """
+    def __init__(self, path, stat, content=None, line_index=None, declarations=None):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self._content = content
+        self._map = None
+        self.line_index = line_index if line_index is not None else LineIndex.from_content(self.content)
+        self._declarations = declarations
+        self._texts = {}
+        self._lines = None
+        self.declarations_changed = False
+
+    @property
+    def content(self):
+        """
+        The file's bytes; large files are mapped rather than read (an mmap slices like bytes).
+        """
+        if self._content is None:
+            if self.size >= MMAP_THRESHOLD:
+                self._map = map_file(self.path)
+                self._content = self._map
+            else:
+                with open(self.path, 'rb') as f:
+                    self._content = f.read()
+        return self._content
+
+    def read(self, start_offset, end_offset):
+        """
+        Bytes between two offsets, both clamped to the file.
+        """
+        start_offset = max(0, min(start_offset, self.size))
+        end_offset = max(0, min(end_offset, self.size))
+        return self.content[start_offset:end_offset]
+
+    def text(self, errors='replace'):
+        if errors not in self._texts:
+            text = bytes(self.content).decode('utf-8', errors=errors)
+            self._texts[errors] = text.replace('\r\n', '\n').replace('\r', '\n')
+        return self._texts[errors]
+
+    def lines(self):
+        """
+        Lines of text() split on "\n" only, like readlines() on a text-mode file.
+        """
+        if self._lines is None:
+            self._lines = io.StringIO(self.text()).readlines()
+        return self._lines
+
+    def line_number(self, offset):
+        """
+        1-based line of a byte offset (clamped to the file).
+        """
+        return self.line_index.line_number(offset)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._content = None
+
+    @property
+    def declarations(self):
+        if self._declarations is None:
+            self._declarations = index_declarations(self.text())
+            self.declarations_changed = True
+        return self._declarations
+
+
+class SourceIndex:
+    """
+    Lazily loads and caches the source files of one project. Use as a context
+    manager (or call save()) to persist new or changed entries.
+    """
+    def __init__(self, repo_root, project_name=None, source_root=None, persist=True):
+        self.repo_root = repo_root
+        project_name = project_name or os.path.basename(os.path.normpath(repo_root))
+        self.source_dir = os.path.join(repo_root, source_root or get_source_root(project_name))
+        self.store_path = os.path.join(repo_root, INDEX_FILE) if persist else None
+        self._files = {}
+        self._dirty = set()
+        self._conn = None
+        if self.store_path:
+            self._conn = sqlite3.connect(self.store_path)
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS files")
+                self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            # content is NULL for mapped files; line_starts is the raw line index array
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    rel_path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content BLOB,
+                    line_starts BLOB NOT NULL,
+                    declarations TEXT
+                )
+            """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def file_path(self, class_name):
+        return os.path.join(self.source_dir, *class_to_rel_path(class_name).split('/'))
+
+    def get(self, class_name):
+        """
+        Returns the SourceFile holding class_name, or None when it does not exist.
+        """
+        return self.get_file(class_to_rel_path(class_name))
+
+    def get_file(self, rel_path):
+        if rel_path in self._files:
+            return self._files[rel_path]
+        path = os.path.join(self.source_dir, *rel_path.split('/'))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._files[rel_path] = None
+            return None
+
+        source_file = self._load(rel_path, path, stat)
+        if source_file is None:
+            source_file = SourceFile(path, stat)
+            self._dirty.add(rel_path)
+        self._files[rel_path] = source_file
+        return source_file
+
+    def _load(self, rel_path, path, stat):
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, content, line_starts, declarations FROM files WHERE rel_path = ?",
+            (rel_path,)).fetchone()
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+            return None
+        declarations = None
+        if row[4] is not None:
+            stored = json.loads(row[4])
+            # Declarations indexed by another version of java_declarations are rebuilt
+            if isinstance(stored, dict) and stored.get("version") == DECLARATIONS_VERSION:
+                declarations = declarations_from_list(stored["declarations"])
+        return SourceFile(path, stat, row[2], LineIndex.from_bytes(row[3], stat.st_size), declarations)
+
+    def build(self):
+        """
+        Indexes every .java file under the source root, declarations included.
+        """
+        count = 0
+        for root, _, files in os.walk(self.source_dir):
+            for name in files:
+                if name.endswith(".java"):
+                    rel_path = os.path.relpath(os.path.join(root, name), self.source_dir).replace(os.sep, "/")
+                    self.get_file(rel_path).declarations
+                    count += 1
+        return count
+
+    def save(self):
+        if self._conn is None:
+            return
+        rows = []
+        for rel_path, source_file in self._files.items():
+            if source_file is None or not (rel_path in self._dirty or source_file.declarations_changed):
+                continue
+            declarations = source_file._declarations
+            content = source_file.content if source_file._map is None else None
+            rows.append((rel_path, source_file.size, source_file.mtime_ns, content,
+                         source_file.line_index.to_bytes(),
+                         json.dumps({"version": DECLARATIONS_VERSION,
+                                     "declarations": declarations_to_list(declarations)})
+                         if declarations is not None else None))
+            source_file.declarations_changed = False
+        if rows:
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        self._dirty.clear()
+
+    def close(self):
+        if self._conn is not None:
+            self.save()
+            self._conn.close()
+            self._conn = None
+        for source_file in self._files.values():
+            if source_file is not None:
+                source_file.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python source_index.py <repositories dir> [project ...]")
+    base_dir = sys.argv[1]
+    projects = sys.argv[2:] or sorted(d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d)))
+    for project_name in projects:
+        with SourceIndex(os.path.join(base_dir, project_name), project_name) as index:
+            count = index.build()
+        print(f"Indexed {count} source files of {project_name} -> {index.store_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Incremental parser for streamed slicing completions.
+# Consumes content deltas as they arrive, detects the ```json block, and yields
+# each slice object as soon as its closing brace is seen. It flags responses that
+# should be aborted early: an analysis section that runs past a length limit, or
+# a JSON block that can no longer become a valid slice list.
+import json
+
+JSON_FENCE = "```json"
+
+
+class StreamingSliceParser:
+    def __init__(self, max_analysis_chars=None):
+        self.max_analysis_chars = max_analysis_chars
+        self.content = ""
+        self.analysis = ""
+        self.slices = []
+        self.error = None   # reason to abort, once set
+        self.done = False   # the slice array has been closed
+        self._fence_search_from = 0
+        self._json_start = None  # offset of the first char after the fence line
+        self._pos = None         # next unscanned offset inside the JSON block
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+        self._seen_array = False
+        self._expect_value = True
+
+    def feed(self, delta):
+        """
+        Adds a content delta and returns the slices completed by it.
+        """
+        if self.done or self.error or not delta:
+            return []
+        self.content += delta
+
+        if self._json_start is None:
+            fence = self.content.find(JSON_FENCE, self._fence_search_from)
+            if fence == -1:
+                # A fence may be split across deltas, so re-check the tail next time
+                self._fence_search_from = max(0, len(self.content) - len(JSON_FENCE))
+                if self.max_analysis_chars and self._fence_search_from > self.max_analysis_chars:
+                    self.error = f"analysis exceeded {self.max_analysis_chars} characters"
+                return []
+            newline = self.content.find("\n", fence)
+            if newline == -1:
+                return []
+            self.analysis = self.content[:fence].strip()
+            self._json_start = newline + 1
+            self._pos = self._json_start
+
+        return self._scan()
+
+    def _scan(self):
+        completed = []
+        text = self.content
+        while self._pos < len(text) and not self.done and not self.error:
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._object_start is not None:
+                # Inside a slice object: only track nesting
+                if ch == '"':
+                    self._in_string = True
+                elif ch in '{[':
+                    self._depth += 1
+                elif ch in '}]':
+                    self._depth -= 1
+                    if self._depth == 1:
+                        completed.extend(self._close_object(self._pos))
+            elif ch.isspace():
+                pass
+            elif not self._seen_array:
+                if ch != '[':
+                    self.error = "JSON block does not start with a slice array"
+                else:
+                    self._seen_array = True
+                    self._depth = 1
+            elif ch == '{' and self._expect_value:
+                self._object_start = self._pos
+                self._depth = 2
+                self._expect_value = False
+            elif ch == ',' and not self._expect_value:
+                self._expect_value = True
+            elif ch == ']':
+                self._depth = 0
+                self.done = True
+            else:
+                self.error = f"unexpected {ch!r} between slices"
+            self._pos += 1
+        return completed
+
+    def _close_object(self, end):
+        raw = self.content[self._object_start:end + 1]
+        self._object_start = None
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.error = f"malformed slice object: {e}"
+            return []
+        self.slices.append(item)
+        return [item]
+
+    def result(self):
+        """
+        Result in the same shape as parse_response, for a completed slice array.
+        """
+        return {
+            "full_response": self.content,
+            "analysis": self.analysis,
+            "slices": self.slices
+        }
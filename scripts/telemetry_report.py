@@ -0,0 +1,181 @@
+# Summarizes the per-call telemetry written by batch_slice_methods.py
+# (repositories/<project>/LLM_slices.telemetry.jsonl): latency percentiles, tokens per
+# method, throughput, finish reasons and failure breakdown, per project and overall.
+#
+# Usage:
+#   python telemetry_report.py                      # latest run of every project
+#   python telemetry_report.py junit3.8 --all       # every run recorded for a project
+#   python telemetry_report.py path/to/file.jsonl --json report.json
+import os
+import sys
+import json
+import math
+import argparse
+
+from usage_tracker import estimate_cost
+
+REPOS_DIR = r"d:\tools\Code slice matching\repositories"
+TELEMETRY_FILE = "LLM_slices.telemetry.jsonl"
+
+
+def load_telemetry(path):
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"  Warning: Ignoring corrupt telemetry line in {path}")
+    return entries
+
+
+def latest_run(entries):
+    """
+    Keeps only the entries of the most recently started run.
+    """
+    if not entries:
+        return entries
+    started = {}
+    for e in entries:
+        started[e["run_id"]] = min(started.get(e["run_id"], e["ts"]), e["ts"])
+    run_id = max(started, key=started.get)
+    return [e for e in entries if e["run_id"] == run_id]
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile; None for an empty list.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def count_by(entries, field):
+    counts = {}
+    for e in entries:
+        value = e.get(field) or "none"
+        counts[value] = counts.get(value, 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def summarize(entries):
+    ok = [e for e in entries if e["status"] == "ok"]
+    methods = {e["method"] for e in entries}
+    prompt = sum(e["prompt_tokens"] for e in entries)
+    cached = sum(e["cached_tokens"] for e in entries)
+    completion = sum(e["completion_tokens"] for e in entries)
+
+    # Wall span from the first request being queued to the last call finishing
+    starts = [e["ts"] - e["latency"] - (e.get("queue_wait") or 0) for e in entries]
+    span = max(e["ts"] for e in entries) - min(starts) if entries else 0.0
+    latencies = [e["latency"] for e in ok]
+    first_tokens = [e["first_token"] for e in ok if e.get("first_token") is not None]
+
+    summary = {
+        "runs": sorted({e["run_id"] for e in entries}),
+        "calls": len(entries),
+        "calls_by_kind": count_by(entries, "kind"),
+        "methods": len(methods),
+        "retried_calls": sum(1 for e in entries if e["attempt"] > 0),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "first_token_p50": percentile(first_tokens, 50),
+        "first_token_p95": percentile(first_tokens, 95),
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "completion_tokens": completion,
+        "cache_hit_ratio": cached / prompt if prompt else 0.0,
+        "prompt_tokens_per_method": prompt / len(methods) if methods else 0.0,
+        "completion_tokens_per_method": completion / len(methods) if methods else 0.0,
+        "wall_seconds": span,
+        "calls_per_minute": len(entries) * 60.0 / span if span else None,
+        "methods_per_minute": len(methods) * 60.0 / span if span else None,
+        "tokens_per_second": (prompt + completion) / span if span else None,
+        "finish_reasons": count_by(entries, "finish_reason"),
+        "failures": count_by([e for e in entries if e["status"] != "ok"], "status"),
+    }
+    models = {e["model"] for e in entries}
+    if len(models) == 1:
+        cost = estimate_cost(prompt, cached, completion, models.pop())
+        if cost:
+            summary["cost_usd"] = round(cost[0], 4)
+    return summary
+
+
+def format_seconds(value):
+    return "n/a" if value is None else f"{value:.2f}s"
+
+
+def format_rate(value, unit):
+    return "n/a" if value is None else f"{value:.1f} {unit}"
+
+
+def print_summary(title, s):
+    print(f"\n=== {title} ===")
+    kinds = ", ".join(f"{n} {k}" for k, n in s["calls_by_kind"].items())
+    print(f"Calls: {s['calls']} ({kinds}); methods: {s['methods']}; retried calls: {s['retried_calls']}")
+    print(f"Latency p50/p95: {format_seconds(s['latency_p50'])} / {format_seconds(s['latency_p95'])}; "
+          f"first token p50/p95: {format_seconds(s['first_token_p50'])} / {format_seconds(s['first_token_p95'])}")
+    print(f"Tokens per method: {s['prompt_tokens_per_method']:.0f} prompt, "
+          f"{s['completion_tokens_per_method']:.0f} completion; cache hit ratio {s['cache_hit_ratio']:.1%}")
+    print(f"Throughput over {s['wall_seconds']:.1f}s: {format_rate(s['methods_per_minute'], 'methods/min')}, "
+          f"{format_rate(s['calls_per_minute'], 'calls/min')}, {format_rate(s['tokens_per_second'], 'tokens/s')}")
+    print("Finish reasons: " + ", ".join(f"{k}={v}" for k, v in s["finish_reasons"].items()))
+    failures = ", ".join(f"{k}={v}" for k, v in s["failures"].items()) or "none"
+    print(f"Failures: {failures}")
+    if "cost_usd" in s:
+        print(f"Estimated cost: ${s['cost_usd']:.4f}")
+
+
+def resolve_paths(targets):
+    if not targets:
+        targets = sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    paths = []
+    for target in targets:
+        path = target if target.endswith(".jsonl") else os.path.join(REPOS_DIR, target, TELEMETRY_FILE)
+        if os.path.exists(path):
+            paths.append((target, path))
+        elif target.endswith(".jsonl") or len(targets) == 1:
+            print(f"No telemetry found at {path}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize LLM call telemetry.")
+    parser.add_argument("targets", nargs="*", help="Projects or telemetry JSONL files (default: all projects)")
+    parser.add_argument("--all", action="store_true", help="Include every recorded run, not only the latest")
+    parser.add_argument("--json", help="Also write the summaries to this JSON file")
+    args = parser.parse_args()
+
+    report = {}
+    combined = []
+    for name, path in resolve_paths(args.targets):
+        entries = load_telemetry(path)
+        if not args.all:
+            entries = latest_run(entries)
+        if not entries:
+            continue
+        report[name] = summarize(entries)
+        print_summary(name, report[name])
+        combined.extend(entries)
+
+    if not report:
+        sys.exit("No telemetry to summarize")
+    if len(report) > 1:
+        report["overall"] = summarize(combined)
+        print_summary("Overall", report["overall"])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSummary saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
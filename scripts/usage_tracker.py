@@ -0,0 +1,169 @@
+# Per-call telemetry for batch_slice_methods.py.
+# Every LLM call (slice or repair attempt) is recorded with its method, token usage,
+# latency, attempt number, finish reason and parse status, appended as one JSON line
+# to repositories/<project>/LLM_slices.telemetry.jsonl, and aggregated in memory for
+# the end-of-run summary: tokens, prompt cache hit ratio, cost and latency saved.
+# telemetry_report.py summarizes the JSONL files afterwards.
+import os
+import json
+import time
+
+from retry_scheduler import classify_exception
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+
+def get_telemetry_path(output_path):
+    base, _ = os.path.splitext(output_path)
+    return base + ".telemetry.jsonl"
+
+
+def make_run_id():
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+
+def usage_fields(usage):
+    """
+    Extracts token counts from an OpenAI usage object (or dict). Returns None when absent.
+    """
+    if usage is None:
+        return None
+
+    def get(obj, name):
+        if obj is None:
+            return None
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    details = get(usage, "prompt_tokens_details")
+    return {
+        "prompt_tokens": get(usage, "prompt_tokens") or 0,
+        "completion_tokens": get(usage, "completion_tokens") or 0,
+        "cached_tokens": get(details, "cached_tokens") or 0,
+    }
+
+
+def estimate_cost(prompt_tokens, cached_tokens, completion_tokens, model):
+    """
+    Returns (cost, saved_by_caching) in USD, or None for models without a price.
+    """
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return None
+    input_price, cached_price, output_price = (p / 1_000_000 for p in prices)
+    cost = (prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price + completion_tokens * output_price
+    return cost, cached_tokens * (input_price - cached_price)
+
+
+class UsageTracker:
+    def __init__(self, model, telemetry_path=None, project=None, run_id=None):
+        self.model = model
+        self.project = project
+        self.run_id = run_id or make_run_id()
+        self.calls = []
+        self._attempts = {}
+        self._file = open(telemetry_path, 'a', encoding='utf-8') if telemetry_path else None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def track(self, kind, method_key, call):
+        """
+        Awaits call(info) and records it. The call fills info with what it learns:
+        sent_at (after rate limiting), usage, finish_reason, first_token.
+        """
+        info = {}
+        started = time.monotonic()
+        try:
+            result = await call(info)
+        except Exception as exc:
+            error = classify_exception(exc)
+            self.record(kind, method_key, info, started, error.kind, str(error))
+            raise
+        self.record(kind, method_key, info, started, "ok")
+        return result
+
+    def record(self, kind, method_key, info, started, status, error=None):
+        """
+        kind is "slice" or "repair"; status is "ok" or a SliceError kind.
+        """
+        now = time.monotonic()
+        sent_at = info.get("sent_at", started)
+        attempt = self._attempts.get((kind, method_key), 0)
+        self._attempts[(kind, method_key)] = attempt + 1
+        fields = usage_fields(info.get("usage"))
+        entry = dict(
+            fields or {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0},
+            run_id=self.run_id,
+            ts=round(time.time(), 3),
+            project=self.project,
+            method=method_key,
+            kind=kind,
+            attempt=attempt,
+            model=self.model,
+            has_usage=fields is not None,
+            latency=round(now - sent_at, 3),
+            first_token=round(info["first_token"], 3) if info.get("first_token") is not None else None,
+            queue_wait=round(sent_at - started, 3),
+            finish_reason=info.get("finish_reason"),
+            status=status,
+            error=error
+        )
+        self.calls.append(entry)
+        if self._file is not None:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def summary(self):
+        calls = [c for c in self.calls if c["has_usage"]]
+        prompt = sum(c["prompt_tokens"] for c in calls)
+        cached = sum(c["cached_tokens"] for c in calls)
+        completion = sum(c["completion_tokens"] for c in calls)
+        summary = {
+            "calls": len(self.calls),
+            "calls_with_usage": len(calls),
+            "failed_calls": sum(1 for c in self.calls if c["status"] != "ok"),
+            "prompt_tokens": prompt,
+            "cached_tokens": cached,
+            "completion_tokens": completion,
+            "cache_hit_ratio": cached / prompt if prompt else 0.0,
+            "calls_with_cache_hit": sum(1 for c in calls if c["cached_tokens"]),
+        }
+
+        cost = estimate_cost(prompt, cached, completion, self.model)
+        if cost:
+            summary["cost_usd"] = round(cost[0], 4)
+            summary["cost_saved_usd"] = round(cost[1], 4)
+
+        # Latency saved is estimated from the time to first token (or total latency
+        # when not streaming) of calls with and without a cache hit.
+        def wait(c):
+            return c["first_token"] if c["first_token"] is not None else c["latency"]
+        hits = [wait(c) for c in calls if c["cached_tokens"]]
+        misses = [wait(c) for c in calls if not c["cached_tokens"]]
+        if hits and misses:
+            saved_per_call = sum(misses) / len(misses) - sum(hits) / len(hits)
+            summary["latency_saved_s"] = round(max(0.0, saved_per_call) * len(hits), 2)
+        return summary
+
+    def format_summary(self):
+        s = self.summary()
+        text = (f"{s['calls']} calls ({s['failed_calls']} failed), {s['prompt_tokens']} prompt tokens "
+                f"({s['cached_tokens']} cached, hit ratio {s['cache_hit_ratio']:.1%}), "
+                f"{s['completion_tokens']} completion tokens")
+        if "cost_usd" in s:
+            text += f"; cost ${s['cost_usd']:.4f}, saved ${s['cost_saved_usd']:.4f} by caching"
+        if "latency_saved_s" in s:
+            text += f", ~{s['latency_saved_s']:.1f}s faster first tokens"
+        return text
@@ -2,8 +2,12 @@ import json
 import re
 import networkx as nx
 import os
+import sys
 import glob
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from java_lexer import brace_balance
+
 # ==========================================
 # 核心类：高级语义切片图构建器
 # ==========================================
@@ -47,9 +51,8 @@ class AdvancedSemanticGraphBuilder:
             
             # 2. 控制流特征分析
             # 计算花括号平衡：正数表示开启了新作用域，负数表示关闭了作用域
-            open_braces = code.count('{')
-            close_braces = code.count('}')
-            balance = open_braces - close_braces
+            # (忽略字符串、字符字面量和注释中的花括号)
+            balance = brace_balance(code)
             
             # 检查是否包含控制流关键字
             has_control_keyword = bool(self.patterns['control_start'].search(code))
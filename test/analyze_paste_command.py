@@ -1,11 +1,17 @@
 import os
+import sys
 import json
 from openai import OpenAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from ccg_index import CCGIndex
+from context_store import open_context_store
+
 # ================= 配置区 =================
 # 确保这些文件名与你本地保存的文件名一致
 ORACLE_FILE = "test/JHotDraw5.2_oracle_methods.json"
-CONTEXT_FILE = "test/context_CH.ifa.draw.standard.ConnectionTool_mouseDrag_MouseEvent__int__int_.json"
+# 含 context_*.json 的目录, 按 (类名, 方法签名) 从其 contexts.sqlite 中读取
+CONTEXT_DIR = "test"
 CCG_FILE = "ccgs/JHotDraw5.2_ccg.json"
 PROMPT_TEMPLATE_FILE = "test/prompt.txt"
 
@@ -23,56 +29,6 @@ def load_text(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
-def find_matching_ccg(method_data, ccg_list):
-    """
-    Finds the matching CCG entry for the given method.
-    """
-    class_name = method_data['class_name']
-    function_name = method_data['function_name']
-    
-    # Extract simple method name (e.g., "init" from "init()")
-    simple_method_name = function_name.split('(')[0]
-    
-    # Convert class name to path suffix (e.g., "a.b.C" -> "a/b/C.java")
-    path_suffix = class_name.replace('.', '/') + ".java"
-    
-    candidates = []
-    for ccg in ccg_list:
-        if ccg['method_name'] == simple_method_name:
-            # Check file path
-            ccg_path = ccg['file_path']
-            # Normalize separators for comparison
-            norm_ccg_path = ccg_path.replace('\\', '/')
-            norm_suffix = path_suffix.replace('\\', '/')
-            
-            if norm_ccg_path.endswith(norm_suffix):
-                candidates.append(ccg)
-    
-    if not candidates:
-        return None
-        
-    if len(candidates) == 1:
-        return candidates[0]
-        
-    # If multiple candidates, try to match by line numbers
-    if 'code_lines' in method_data and method_data['code_lines']:
-        method_start = method_data['code_lines'][0]['line']
-        method_end = method_data['code_lines'][-1]['line']
-        
-        for ccg in candidates:
-            # Check if CCG nodes overlap with method lines
-            ccg_lines = [node['line_num'] for node in ccg.get('nodes', [])]
-            if not ccg_lines:
-                continue
-            ccg_start = min(ccg_lines)
-            ccg_end = max(ccg_lines)
-            
-            # Simple overlap check
-            if not (ccg_end < method_start or ccg_start > method_end):
-                return ccg
-                
-    return candidates[0] # Fallback
-
 def run_single_analysis():
     print(f"开始分析方法: {TARGET_CLASS}::{TARGET_FUNCTION}...")
 
@@ -80,15 +36,21 @@ def run_single_analysis():
     print(f"加载 Oracle 数据: {ORACLE_FILE}")
     oracle_data = load_json(ORACLE_FILE)
     
-    print(f"加载 Context 数据: {CONTEXT_FILE}")
-    context_data = load_json(CONTEXT_FILE)
+    print(f"加载 Context 数据: {CONTEXT_DIR}")
+    context_store = open_context_store(CONTEXT_DIR)
+    context_data = context_store.get(TARGET_CLASS, TARGET_FUNCTION) if context_store else None
+    if context_store:
+        context_store.close()
+    if context_data is None:
+        print(f"警告: 在 {CONTEXT_DIR} 中找不到目标方法的 Context")
+        context_data = {"message": "Context information not available"}
     
     print(f"加载 CCG 数据: {CCG_FILE}")
     if os.path.exists(CCG_FILE):
-        ccg_list = load_json(CCG_FILE)
+        ccg_index = CCGIndex(load_json(CCG_FILE))
     else:
         print(f"警告: CCG 文件不存在: {CCG_FILE}")
-        ccg_list = []
+        ccg_index = CCGIndex([])
         
     prompt_template = load_text(PROMPT_TEMPLATE_FILE)
 
@@ -103,7 +65,7 @@ def run_single_analysis():
         return
 
     # 3. 查找匹配的 CCG
-    ccg_data = find_matching_ccg(focal_method, ccg_list)
+    ccg_data = ccg_index.lookup(focal_method)
     if not ccg_data:
         print("警告: 未找到匹配的 CCG 数据")
         ccg_str = "No CCG available"
@@ -0,0 +1,71 @@
+# Regression checks for the declaration index of scripts/java_declarations.py.
+# Run with: python -m pytest test   (or python test/test_java_declarations.py)
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from java_declarations import index_declarations
+from source_index import SourceIndex
+from extract_method_code import find_method
+
+JUNIT_ROOT = os.path.join(ROOT, "repositories", "junit3.8")
+
+
+def test_calls_are_not_declarations():
+    source = (
+        "class Runner {\n"
+        "    Runner() {\n"
+        "        setup();\n"
+        "    }\n"
+        "    static Properties getPreferences() {\n"
+        "        if (p == null) {\n"
+        "            getPreferences().load(is);\n"
+        "            writeInt(c.getRed());\n"
+        "        }\n"
+        "        return p;\n"
+        "    }\n"
+        "    void run() {\n"
+        "        new Thread(new Runnable() {\n"
+        "            public void run() { work(); }\n"
+        "        });\n"
+        "    }\n"
+        "}\n"
+    )
+    index = index_declarations(source)
+    assert sorted((name, d["line"]) for (name, _), ds in index.items() for d in ds) == [
+        ("Runner", 2), ("getPreferences", 5), ("run", 12), ("run", 14)]
+
+
+def test_bodiless_declarations_are_skipped():
+    source = (
+        "abstract class Loader {\n"
+        "    abstract void load(String s)\n"
+        "        throws java.io.IOException;\n"
+        "    interface Sink { void put(int v) throws Exception; }\n"
+        "    void save() {\n"
+        "        put(1);\n"
+        "    }\n"
+        "}\n"
+    )
+    index = index_declarations(source)
+    assert [(name, d["line"], d["body_start"], d["body_end"]) for (name, _), ds in index.items() for d in ds] == [
+        ("save", 5, 5, 7)]
+
+
+def test_get_preferences_resolves_to_its_declaration():
+    # The oracle slice of BaseTestRunner.getPreferences() starts at line 40, two lines
+    # above the getPreferences().load(is) call at line 42
+    with SourceIndex(JUNIT_ROOT, "junit3.8", persist=False) as index:
+        source_file = index.get("junit.runner.BaseTestRunner")
+        assert [d["line"] for d in source_file.declarations[("getPreferences", ())]] == [33]
+        code_lines = find_method(source_file, "getPreferences", [], start_line=40)
+    assert code_lines[0]["line"] == 33
+    assert code_lines[-1]["line"] == 52
+
+
+if __name__ == "__main__":
+    test_calls_are_not_declarations()
+    test_bodiless_declarations_are_skipped()
+    test_get_preferences_resolves_to_its_declaration()
+    print("ok")
@@ -0,0 +1,35 @@
+# Regression checks for the body normalization of scripts/method_dedup.py.
+# Run with: python -m pytest test   (or python test/test_method_dedup.py)
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from method_dedup import significant_lines, dedup_key
+from slice_validator import required_lines
+
+
+def make_method(code, first_line=10):
+    return {"code_lines": [{"line": first_line + i, "code": text}
+                           for i, text in enumerate(code.split("\n"))]}
+
+
+def test_url_literals_are_not_comments():
+    a = make_method('void open() {\n    print("http://a.com");\n}')
+    b = make_method('void open() {\n    print("http://b.org/other");\n}')
+    assert significant_lines(a)[1] == (11, 'print("http://a.com");')
+    assert dedup_key(a, None) != dedup_key(b, None)
+    assert required_lines(a) == [11]
+
+
+def test_comments_do_not_change_the_key():
+    a = make_method('void open() {\n    run(); // first\n}')
+    b = make_method('void open() {\n    /* a\n       b */\n    run();\n}')
+    assert dedup_key(a, None) == dedup_key(b, None)
+    assert [line for line, _ in significant_lines(b)] == [10, 13, 14]
+
+
+if __name__ == "__main__":
+    test_url_literals_are_not_comments()
+    test_comments_do_not_change_the_key()
+    print("ok")